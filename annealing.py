@@ -0,0 +1,99 @@
+import math
+import random
+import time
+
+def simulated_annealing(scorer, size_bus, time_budget, start_temperature=2.0, end_temperature=0.05,
+                        swap_probability=0.3, seed=None, on_best=None, report_interval=1.0, should_stop=None):
+    '''
+        Simulated annealing over single-student moves and pairwise swaps
+
+        Every step proposes either moving a random student to a random bus or
+        trading it with a random student of another bus, reads the score change
+        from the scorer's move_gain or swap_gain and accepts it with the Metropolis rule.
+        The temperature falls geometrically from start_temperature to
+        end_temperature over the wall-clock budget. Moves never exceed size_bus
+        and never empty a bus, so every visited assignment stays feasible.
+
+        Inputs:
+            scorer - a scorer holding a feasible assignment, annealed in place;
+                     an ExactScorer (see objective.py) in the solver. Only its
+                     score, bus_of, sizes and num_buses and its move_gain,
+                     swap_gain, move and swap methods are used
+            size_bus - the capacity of every bus
+            time_budget - the number of seconds to anneal for
+            start_temperature, end_temperature - the temperature schedule
+            swap_probability - the fraction of steps that propose a swap
+            seed - seed for the random number generator
+            on_best - optional callback given the scorer while it holds a new
+                      best assignment, at most once every report_interval seconds
+            should_stop - optional callback called every time the clock is
+                          checked; annealing ends early when it returns True
+
+        Outputs:
+            (best_score, steps) - the scorer is left on the best assignment found
+    '''
+    rng = random.Random(seed)
+    num_students = len(scorer.bus_of)
+    num_buses = scorer.num_buses
+    if num_students < 2 or num_buses < 2 or time_budget <= 0:
+        return scorer.score, 0
+
+    bus_of = scorer.bus_of
+    sizes = scorer.sizes
+    best_score = scorer.score
+    best_bus_of = bus_of.copy()
+    at_best = True
+
+    start = time.time()
+    deadline = start + time_budget
+    reported_score = best_score
+    reported_at = start
+    cooling = math.log(end_temperature / start_temperature)
+    temperature = start_temperature
+    steps = 0
+    while True:
+        # checking the clock is comparatively slow, so do it every few hundred steps
+        if steps % 256 == 0:
+            now = time.time()
+            if now >= deadline or (should_stop is not None and should_stop()):
+                break
+            if on_best is not None and at_best and best_score > reported_score and now - reported_at >= report_interval:
+                on_best(scorer)
+                reported_score = best_score
+                reported_at = now
+            temperature = start_temperature * math.exp(cooling * (now - start) / time_budget)
+        steps += 1
+
+        student = rng.randrange(num_students)
+        if rng.random() < swap_probability:
+            other = rng.randrange(num_students)
+            if bus_of[student] == bus_of[other]:
+                continue
+            delta = scorer.swap_gain(student, other)
+        else:
+            other = None
+            bus_num = rng.randrange(num_buses)
+            if bus_num == bus_of[student] or sizes[bus_num] >= size_bus or sizes[bus_of[student]] <= 1:
+                continue
+            delta = scorer.move_gain(student, bus_num)
+
+        if delta < 0 and rng.random() >= math.exp(delta / temperature):
+            continue
+        # leaving the best assignment found so far: remember it first
+        if delta < 0 and at_best:
+            best_bus_of = bus_of.copy()
+        if other is None:
+            scorer.move(student, bus_num)
+        else:
+            scorer.swap(student, other)
+
+        if scorer.score > best_score:
+            best_score = scorer.score
+            at_best = True
+        else:
+            at_best = at_best and delta == 0
+
+    if not at_best:
+        for student in (bus_of != best_bus_of).nonzero()[0].tolist():
+            scorer.move(student, int(best_bus_of[student]))
+    return scorer.score, steps
@@ -0,0 +1,72 @@
+import numpy as np
+
+class Assignment:
+    '''
+        Student-to-bus assignment shared by the heuristics and optimizers.
+
+        `bus_of[s]` is the bus of student s (-1 while unassigned), `members[b]`
+        is the set of students on bus b and `sizes[b]` its head count, so
+        lookups, moves and size queries are all O(1).
+    '''
+
+    def __init__(self, num_students, num_buses):
+        self.bus_of = np.full(num_students, -1, dtype=np.int64)
+        self.members = [set() for _ in range(num_buses)]
+        self.sizes = np.zeros(num_buses, dtype=np.int64)
+
+    @classmethod
+    def from_buses(cls, num_students, buses):
+        '''
+            Builds an Assignment from a list of lists of student ids
+        '''
+        assignment = cls(num_students, len(buses))
+        for bus_num, bus in enumerate(buses):
+            for student in bus:
+                assignment.assign(student, bus_num)
+        return assignment
+
+    @property
+    def num_students(self):
+        return len(self.bus_of)
+
+    @property
+    def num_buses(self):
+        return len(self.members)
+
+    def find_bus(self, student):
+        return int(self.bus_of[student])
+
+    def size(self, bus_num):
+        return int(self.sizes[bus_num])
+
+    def assign(self, student, bus_num):
+        '''
+            Seats a student that is not on any bus yet
+        '''
+        self.bus_of[student] = bus_num
+        self.members[bus_num].add(student)
+        self.sizes[bus_num] += 1
+
+    def move(self, student, bus_num):
+        '''
+            Moves a seated student to bus `bus_num`
+        '''
+        old_bus = self.bus_of[student]
+        if old_bus == bus_num:
+            return
+        self.members[old_bus].discard(student)
+        self.sizes[old_bus] -= 1
+        self.assign(student, bus_num)
+
+    def copy(self):
+        other = Assignment(0, 0)
+        other.bus_of = self.bus_of.copy()
+        other.members = [set(bus) for bus in self.members]
+        other.sizes = self.sizes.copy()
+        return other
+
+    def buses(self):
+        '''
+            Returns the assignment as a list of sorted lists of student ids
+        '''
+        return [sorted(bus) for bus in self.members]
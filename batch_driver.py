@@ -0,0 +1,252 @@
+import argparse
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from assignment import Assignment
+from instance_cache import content_hash
+from objective import exact_score, total_friendships, upper_bound
+from output_scorer import score_output_fast
+from solution_store import SolutionStore, default_path
+from solver import (build_rowdy_index, load_instance, read_output, solve, solve_annealing, solve_anytime,
+                    solve_warm_start, switch_optimizer, tabu_optimizer, write_output)
+
+####################################################
+# To run:
+#   python3 batch_driver.py [category ...] [--workers N]
+#
+#   category - input size categories to solve, all of them when omitted
+#   --workers - size of the process pool, defaults to the number of cores
+#   --parallel-pipelines - run the heuristics of each instance concurrently too
+#   --anneal SECONDS - solve with simulated annealing under a per-instance budget
+#   --deadline SECONDS - anytime solving: stop each instance after SECONDS, recording every
+#                        improvement as it is found
+#   --optimizer - switch (FM + swaps, the default) or tabu
+#   --construction - greedy (the three heuristic orderings, the default), multilevel, spectral or
+#                    label_propagation
+#   --resume - pick up where earlier runs left off: instances already at their upper bound,
+#              already solved with the same settings, or whose .out file already holds the
+#              best stored solution are skipped, the others are improved by local search
+#              from their best known solution
+#   --store PATH - the solution store, solutions.sqlite in the outputs folder by default
+#   --verbose - print the iteration count and iterations per second of every tabu search
+#
+# Every solution found is recorded in the solution store (see solution_store.py) with
+# its score, settings and runtime. A .out file is only ever rewritten with a strictly
+# better solution than the best one recorded for its input (or already in the file),
+# so any number of runs and strategies can share the outputs folder.
+#
+# Examples:
+#   python3 batch_driver.py large2 large3 large4 --workers 32
+####################################################
+
+all_categories = ["small", "medium", "large", "large2", "large3", "large4"]
+
+optimizers = {"switch": switch_optimizer, "tabu": tabu_optimizer}
+
+constructions = ["greedy", "multilevel", "spectral", "label_propagation"]
+
+def select_optimizer(name, verbose=False):
+    '''
+        Returns the optimizer called `name` in `optimizers`; with verbose, the
+        tabu optimizer also prints its iteration count and throughput
+    '''
+    if verbose and name == "tabu":
+        return functools.partial(tabu_optimizer, verbose=True)
+    return optimizers[name]
+
+def list_instances(categories, path_to_inputs):
+    '''
+        Returns (category, input_name) for every input folder of the given
+        categories that has both a graph.gml and a parameters.txt
+    '''
+    instances = []
+    for size in categories:
+        category_path = path_to_inputs + "/" + size
+        for input_name in sorted(os.listdir(category_path)):
+            input_folder = category_path + "/" + input_name
+            if os.path.isfile(input_folder + "/graph.gml") and os.path.isfile(input_folder + "/parameters.txt"):
+                instances.append((size, input_name))
+            else:
+                print("Skipping incomplete input " + size + "/" + input_name)
+    return instances
+
+def score_solution(graph, constraints, graph_prime, solution):
+    '''
+        Returns the exact score (see objective.py) of a list of buses of student labels
+    '''
+    assignment = Assignment.from_buses(graph.num_nodes, [graph.ids(bus) for bus in solution])
+    return exact_score(graph_prime, build_rowdy_index(graph_prime, constraints), assignment.bus_of)
+
+def read_existing(input_folder, output_path, graph, constraints, graph_prime):
+    '''
+        Validates and scores the .out file already at output_path with the fast scorer
+
+        Outputs:
+            (score, solution) - the file's exact score (see objective.py) and its
+            buses of student labels, or None when there is no valid file
+    '''
+    if not os.path.isfile(output_path):
+        return None
+    score, msg = score_output_fast(input_folder, output_path)
+    if score < 0:
+        print("Ignoring {}: {}".format(output_path, msg))
+        return None
+    solution = read_output(output_path)
+    return score_solution(graph, constraints, graph_prime, solution), solution
+
+def same_solution(solution, other):
+    '''
+        Returns whether two lists of buses of student labels seat every
+        student the same way, whatever the order of the buses and their seats
+    '''
+    def buses(solution):
+        return {frozenset(str(label) for label in bus) for bus in solution if bus}
+    return buses(solution) == buses(other)
+
+def best_known(store, instance, input_hash, total, input_folder, output_path, graph, constraints, graph_prime):
+    '''
+        Reconciles the solution store with the instance's .out file: a valid
+        .out file the store has not seen, e.g. from an older run, is recorded,
+        and a missing, invalid or worse one is replaced by the best recorded
+        solution
+
+        Outputs:
+            (score, solution) of the best known solution, or None when there is none
+    '''
+    best = store.best(input_hash)
+    existing = read_existing(input_folder, output_path, graph, constraints, graph_prime)
+    if existing is not None and (best is None or existing[0] > best[0]):
+        store.record(instance, input_hash, existing[0], total, "imported", {}, 0.0, existing[1])
+        return existing
+    if best is not None and (existing is None or existing[0] < best[0]):
+        write_output(output_path, best[1])
+    return best
+
+def solve_instance(size, input_name, path_to_inputs, path_to_outputs, parallel=False, anneal=None,
+                   optimizer="switch", construction="greedy", deadline=None, resume=False, store_path=None,
+                   verbose=False):
+    '''
+        Solves one input folder and records its solutions in the solution store,
+        which writes the instance's best solution to its .out file; runs inside a worker
+
+        Outputs:
+            (size, input_name, seconds, pid, status) - status is "improved" when the
+            run found the instance's new best solution, "kept" when an earlier one
+            is still the best, or with resume "skipped" when the instance needs no
+            more work: its best solution reaches the upper bound, a run with the
+            same settings has already finished on it, or its .out file already
+            holds the best solution in the store
+    '''
+    start = time.time()
+    instance = size + "/" + input_name
+    input_folder = path_to_inputs + "/" + instance
+    output_path = path_to_outputs + "/" + instance + ".out"
+    graph, num_buses, size_bus, constraints, graph_prime = load_instance(input_folder)
+    input_hash = content_hash(input_folder)
+    total = total_friendships(graph_prime)
+    config = {"optimizer": optimizer, "construction": construction, "parallel": parallel, "anneal": anneal,
+              "deadline": deadline, "resume": resume}
+    improved = []
+    optimizer_function = select_optimizer(optimizer, verbose)
+
+    def record(algorithm, score, solution):
+        improved.append(store.record(instance, input_hash, score, total, algorithm, config, time.time() - start,
+                                     solution, output_path))
+
+    store = SolutionStore(store_path or default_path(path_to_outputs))
+    try:
+        stored = store.best(input_hash)
+        exported = (stored is not None and os.path.isfile(output_path)
+                    and same_solution(read_output(output_path), stored[1]))
+        best = best_known(store, instance, input_hash, total, input_folder, output_path, graph, constraints,
+                          graph_prime)
+        min_score, warm_start = best if resume and best is not None else (None, None)
+        if resume and (store.has_run(input_hash, "batch", config) or exported
+                       or (min_score is not None and min_score >= upper_bound(graph_prime, size_bus))):
+            return size, input_name, time.time() - start, os.getpid(), "skipped"
+        if deadline:
+            solve_anytime(graph, num_buses, size_bus, constraints, start + deadline, None, graph_prime,
+                          optimizer_function, construction, min_score=min_score, warm_start=warm_start,
+                          on_improvement=lambda solution, score: record("anytime", score, solution))
+        elif warm_start is not None:
+            score, solution = solve_warm_start(graph, num_buses, size_bus, constraints, warm_start, graph_prime,
+                                               optimizer_function)
+            record("warm_start", score, solution)
+        elif anneal:
+            solution = solve_annealing(graph, num_buses, size_bus, constraints, graph_prime, time_budget=anneal)
+            record("annealing", score_solution(graph, constraints, graph_prime, solution), solution)
+        else:
+            solution = solve(graph, num_buses, size_bus, constraints, graph_prime, parallel, optimizer_function,
+                             construction)
+            record("solve", score_solution(graph, constraints, graph_prime, solution), solution)
+        store.record_run(instance, input_hash, "batch", config, time.time() - start)
+    finally:
+        store.close()
+    return size, input_name, time.time() - start, os.getpid(), "improved" if any(improved) else "kept"
+
+def run_batch(categories, path_to_inputs, path_to_outputs, workers=None, parallel=False, anneal=None,
+              optimizer="switch", construction="greedy", deadline=None, resume=False, store_path=None,
+              verbose=False):
+    '''
+        Solves every instance of the given categories across a process pool
+
+        Inputs:
+            categories - a list of size category folder names under path_to_inputs
+            path_to_inputs - the folder containing the size category folders
+            path_to_outputs - the folder the .out files are written to
+            workers - the number of worker processes, defaults to the number of cores
+            parallel - also run each instance's heuristic pipelines in parallel
+            anneal - if set, solve with simulated annealing using this many seconds per instance
+            optimizer - the name of the optimizer applied after each heuristic, see `optimizers`
+            construction - the construction passed to solve, see `constructions`
+            deadline - if set, solve anytime with this many seconds per instance
+            resume - skip instances that need no more work and start the others from
+                     their best known solution, see solve_instance
+            store_path - the solution store, solutions.sqlite in path_to_outputs by default
+            verbose - print the throughput of the tabu optimizer
+    '''
+    for size in categories:
+        os.makedirs(path_to_outputs + "/" + size, exist_ok=True)
+    instances = list_instances(categories, path_to_inputs)
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(solve_instance, size, input_name, path_to_inputs, path_to_outputs, parallel, anneal,
+                               optimizer, construction, deadline, resume, store_path, verbose)
+                   for size, input_name in instances]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                size, input_name, seconds, pid, status = future.result()
+            except Exception as error:
+                print("[{}/{}] Failed: {!r}".format(done, len(instances), error))
+                continue
+            print("[{}/{}] Completed {}/{} ({}) in {:.2f}s (worker {}, {:.0f}s elapsed)".format(
+                done, len(instances), size, input_name, status, seconds, pid, time.time() - start))
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve input folders in parallel")
+    parser.add_argument("categories", nargs="*", default=all_categories)
+    parser.add_argument("--inputs", default="./all_inputs")
+    parser.add_argument("--outputs", default="./outputs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--parallel-pipelines", action="store_true",
+                        help="run the three heuristic pipelines of each instance in parallel")
+    parser.add_argument("--anneal", type=float, default=None, metavar="SECONDS",
+                        help="solve with simulated annealing, spending SECONDS per instance")
+    parser.add_argument("--optimizer", choices=sorted(optimizers), default="switch",
+                        help="optimizer applied to each heuristic's result")
+    parser.add_argument("--construction", choices=constructions, default="greedy",
+                        help="how the starting assignments are built")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="stop each instance after SECONDS, keeping its best solution so far")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip instances already solved and start the others from their best known solution")
+    parser.add_argument("--store", default=None, metavar="PATH", help="the solution store database")
+    parser.add_argument("--verbose", action="store_true", help="print the throughput of the tabu optimizer")
+    args = parser.parse_args()
+    run_batch(args.categories, args.inputs, args.outputs, args.workers, args.parallel_pipelines, args.anneal,
+              args.optimizer, args.construction, args.deadline, args.resume, args.store, args.verbose)
+
+if __name__ == '__main__':
+    main()
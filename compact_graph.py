@@ -0,0 +1,183 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+class CompactGraph:
+    '''
+        Undirected weighted graph over dense integer ids, stored CSR-style.
+
+        Node labels are interned once: `labels[i]` is the label of node i and
+        `index[label]` gives i back. The neighbors of node u are
+        `neighbors[offsets[u]:offsets[u + 1]]` (sorted ascending) and the
+        matching edge weights live at the same positions in `weights`.
+        Self-loops are kept out of the rows; `self_loops[u]` records whether
+        node u has one.
+    '''
+
+    def __init__(self, labels, offsets, neighbors, weights, self_loops=None):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        if self_loops is None:
+            self_loops = np.zeros(len(self.labels), dtype=bool)
+        self.self_loops = self_loops
+
+    @classmethod
+    def from_edges(cls, labels, sources, targets, weights=None, self_loops=None):
+        '''
+            Builds a CompactGraph from parallel edge arrays
+
+            Inputs:
+                labels - a list of node labels, position i is the label of node i
+                sources, targets - integer arrays of edge endpoints (node ids)
+                weights - optional integer array of edge weights, defaults to all 1
+                self_loops - optional boolean array of nodes with a self-loop
+
+            Outputs:
+                a CompactGraph; each undirected edge is stored in both rows,
+                duplicate edges keep their largest weight and self-loops among
+                the edges are moved into `self_loops`
+        '''
+        num_nodes = len(labels)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(sources), dtype=np.int8)
+        weights = np.asarray(weights, dtype=np.int8)
+
+        loops = sources == targets
+        if self_loops is None:
+            self_loops = np.zeros(num_nodes, dtype=bool)
+        else:
+            self_loops = np.array(self_loops, dtype=bool)
+        self_loops[sources[loops]] = True
+        sources, targets, weights = sources[~loops], targets[~loops], weights[~loops]
+
+        rows = np.concatenate((sources, targets))
+        cols = np.concatenate((targets, sources))
+        both_weights = np.concatenate((weights, weights))
+
+        order = np.lexsort((cols, rows))
+        keys = rows[order] * num_nodes + cols[order]
+        both_weights = both_weights[order]
+        keys, starts = np.unique(keys, return_index=True)
+        if len(keys):
+            both_weights = np.maximum.reduceat(both_weights, starts)
+        else:
+            both_weights = both_weights[:0]
+
+        rows = keys // num_nodes if num_nodes else keys
+        neighbors = (keys - rows * num_nodes).astype(np.int32)
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=offsets[1:])
+        return cls(labels, offsets, neighbors, both_weights.astype(np.int8), self_loops)
+
+    def overlay(self, weights):
+        '''
+            Returns a graph over the same nodes and edges with other edge weights
+
+            Only `weights` (in the CSR order of this graph) is new; the labels,
+            index, offsets, neighbors and self-loops are shared, not copied.
+        '''
+        graph = CompactGraph.__new__(CompactGraph)
+        graph.labels = self.labels
+        graph.index = self.index
+        graph.offsets = self.offsets
+        graph.neighbors = self.neighbors
+        graph.weights = weights
+        graph.self_loops = self.self_loops
+        return graph
+
+    def to_shared_memory(self):
+        '''
+            Copies the CSR arrays into shared memory so worker processes can read
+            the graph without each receiving a pickled copy
+
+            Outputs:
+                (blocks, handle)
+                blocks - the SharedMemory blocks; the caller must close and unlink them
+                handle - a small picklable description to pass to from_shared_memory
+        '''
+        blocks = []
+        arrays = {}
+        for name in ("offsets", "neighbors", "weights", "self_loops"):
+            array = getattr(self, name)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            blocks.append(block)
+            arrays[name] = (block.name, array.shape, array.dtype.str)
+        return blocks, {"labels": self.labels, "arrays": arrays}
+
+    @classmethod
+    def from_shared_memory(cls, handle):
+        '''
+            Attaches to a graph published with to_shared_memory; the arrays are
+            read-only views of the shared blocks
+
+            Outputs:
+                (graph, blocks) - close the blocks once the graph is no longer used
+        '''
+        blocks = []
+        arrays = {}
+        for name, (block_name, shape, dtype) in handle["arrays"].items():
+            block = shared_memory.SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            blocks.append(block)
+            arrays[name] = array
+        graph = cls(handle["labels"], arrays["offsets"], arrays["neighbors"], arrays["weights"],
+                    arrays["self_loops"])
+        return graph, blocks
+
+    @property
+    def num_nodes(self):
+        return len(self.labels)
+
+    @property
+    def num_edges(self):
+        return len(self.neighbors) // 2
+
+    @property
+    def num_self_loops(self):
+        return int(np.count_nonzero(self.self_loops))
+
+    def edges(self):
+        '''
+            Returns (sources, targets, weights) with every undirected edge once, u < v
+        '''
+        rows = np.repeat(np.arange(self.num_nodes), self.degrees())
+        upper = rows < self.neighbors
+        return rows[upper], self.neighbors[upper], self.weights[upper]
+
+    def degree(self, u):
+        return int(self.offsets[u + 1] - self.offsets[u])
+
+    def degrees(self):
+        return np.diff(self.offsets)
+
+    def neighbors_of(self, u):
+        return self.neighbors[self.offsets[u]:self.offsets[u + 1]]
+
+    def weights_of(self, u):
+        return self.weights[self.offsets[u]:self.offsets[u + 1]]
+
+    def weight(self, u, v):
+        '''
+            Returns the weight of edge (u, v), or 0 if there is no such edge
+        '''
+        start = self.offsets[u]
+        end = self.offsets[u + 1]
+        pos = start + np.searchsorted(self.neighbors[start:end], v)
+        if pos < end and self.neighbors[pos] == v:
+            return int(self.weights[pos])
+        return 0
+
+    def has_edge(self, u, v):
+        return self.weight(u, v) != 0
+
+    def ids(self, labels):
+        return [self.index[label] for label in labels]
+
+    def labels_of(self, ids):
+        return [self.labels[i] for i in ids]
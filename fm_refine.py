@@ -0,0 +1,204 @@
+import time
+import numpy as np
+
+class GainBuckets:
+    '''
+        Bucket array of candidate moves keyed by gain.
+
+        A move is a (student, bus) pair. Moves with gain g live in
+        `buckets[g + max_gain]`, so inserting, removing and re-keying a move is
+        O(1) and the best moves are found by walking down from `top`.
+    '''
+
+    def __init__(self, max_gain):
+        self.max_gain = max_gain
+        self.buckets = [set() for _ in range(2 * max_gain + 1)]
+        self.gain_of = {}
+        self.top = -1
+
+    def insert(self, move, gain):
+        slot = gain + self.max_gain
+        self.buckets[slot].add(move)
+        self.gain_of[move] = gain
+        if slot > self.top:
+            self.top = slot
+
+    def remove(self, move):
+        gain = self.gain_of.pop(move, None)
+        if gain is not None:
+            self.buckets[gain + self.max_gain].discard(move)
+
+    def update(self, move, gain):
+        old_gain = self.gain_of.get(move)
+        if old_gain == gain:
+            return
+        if old_gain is not None:
+            self.buckets[old_gain + self.max_gain].discard(move)
+        self.insert(move, gain)
+
+    def best(self, bus_of, open_targets, donors):
+        '''
+            Returns (move, gain) for a highest-gain move (student, bus) whose bus
+            is in `open_targets` and whose student sits on a bus in `donors`, or
+            None when no stored move is feasible
+        '''
+        while self.top >= 0 and not self.buckets[self.top]:
+            self.top -= 1
+        for slot in range(self.top, -1, -1):
+            for move in self.buckets[slot]:
+                if open_targets[move[1]] and donors[bus_of[move[0]]]:
+                    return move, slot - self.max_gain
+        return None
+
+def fill_empty_buses(scorer):
+    '''
+        Seats one student on every empty bus, each time taking the move that
+        loses the least score from a bus that keeps at least one student
+    '''
+    for bus_num in np.flatnonzero(scorer.sizes == 0):
+        donors = scorer.sizes[scorer.bus_of] > 1
+        if not donors.any():
+            return
+        losses = scorer.friends[np.arange(len(scorer.bus_of)), scorer.bus_of] - scorer.friends[:, bus_num]
+        losses = np.where(donors, losses, np.iinfo(losses.dtype).max)
+        scorer.move(int(np.argmin(losses)), bus_num)
+
+def fm_refine(scorer, size_bus, stall_limit=100, max_passes=50, deadline=None, should_stop=None):
+    '''
+        Fiduccia-Mattheyses style refinement of an assignment
+
+        Each pass repeatedly applies the best feasible move among students that
+        have not moved yet in this pass, even when its gain is negative, locks
+        the moved student and re-keys only the moves of its neighbors. At the
+        end of the pass the moves after the best prefix are rolled back. Passes
+        repeat until one fails to improve the score.
+
+        Moves never exceed `size_bus` and never leave a bus empty; empty buses
+        are filled first.
+
+        Inputs:
+            scorer - an IncrementalScorer, refined in place
+            size_bus - the capacity of every bus
+            stall_limit - end a pass after this many moves without a new best
+            max_passes - upper bound on the number of passes
+            deadline - optional time.time() at which to stop; the pass under way
+                       is rolled back to its best prefix as usual
+            should_stop - optional callback, checked with the deadline, that stops
+                          the refinement the same way when it returns True
+
+        Outputs:
+            the final score, which is also scorer.score
+    '''
+    fill_empty_buses(scorer)
+    num_students = len(scorer.bus_of)
+    if num_students == 0:
+        return scorer.score
+    max_gain = max(1, int(scorer.graph_prime.degrees().max()))
+
+    for _ in range(max_passes):
+        if (deadline is not None and time.time() >= deadline) or (should_stop is not None and should_stop()):
+            break
+        start_score = scorer.score
+        buckets = GainBuckets(max_gain)
+        for student in range(num_students):
+            insert_moves(buckets, scorer, student)
+
+        bus_of = scorer.bus_of.tolist()
+        locked = set()
+        moves = []
+        best_score = scorer.score
+        best_length = 0
+        while len(moves) - best_length < stall_limit:
+            if (deadline is not None and time.time() >= deadline) or (should_stop is not None and should_stop()):
+                break
+            sizes = scorer.sizes.tolist()
+            found = buckets.best(bus_of, [size < size_bus for size in sizes], [size > 1 for size in sizes])
+            if found is None:
+                break
+            (student, bus_num), _ = found
+            old_bus = bus_of[student]
+            scorer.move(student, bus_num)
+            bus_of[student] = bus_num
+            moves.append((student, old_bus))
+            locked.add(student)
+
+            for other_bus in range(scorer.num_buses):
+                buckets.remove((student, other_bus))
+            for neighbor in scorer.friend_lists[student].tolist():
+                if neighbor in locked:
+                    continue
+                if bus_of[neighbor] in (old_bus, bus_num):
+                    insert_moves(buckets, scorer, neighbor)
+                else:
+                    for changed_bus in (old_bus, bus_num):
+                        buckets.update((neighbor, changed_bus), scorer.move_gain(neighbor, changed_bus))
+
+            if scorer.score > best_score:
+                best_score = scorer.score
+                best_length = len(moves)
+
+        # roll back to the best prefix of the pass
+        for student, old_bus in reversed(moves[best_length:]):
+            scorer.move(student, old_bus)
+
+        if scorer.score <= start_score:
+            break
+    return scorer.score
+
+def swap_refine(scorer, max_passes=50, deadline=None, should_stop=None):
+    '''
+        Improves an assignment by trading pairs of students between buses, which
+        still works when every bus is full and no single move is feasible
+
+        Only pairs that share friends are tried: student s on bus a is paired with
+        students of buses b where s has friends, and the best partner t on b is the
+        one with the most friends on a. Gains come from the friend counts in O(1)
+        per pair, and every improving swap is applied immediately. Stops early
+        at the optional time.time() `deadline`, or once the optional
+        `should_stop` callback returns True.
+
+        Outputs:
+            the number of swaps applied
+    '''
+    swaps = 0
+    for _ in range(max_passes):
+        swapped = False
+        for student in range(len(scorer.bus_of)):
+            if (deadline is not None and time.time() >= deadline) or (should_stop is not None and should_stop()):
+                return swaps
+            bus_a = scorer.bus_of[student]
+            friends = scorer.friends[student]
+            best_gain = 0
+            best_other = None
+            for bus_b in np.flatnonzero(friends > 0):
+                if bus_b == bus_a:
+                    continue
+                others = np.fromiter(scorer.assignment.members[bus_b], dtype=np.int64)
+                move_gain = friends[bus_b] - friends[bus_a]
+                gains = move_gain + scorer.friends[others, bus_a] - scorer.friends[others, bus_b]
+                if gains.max() <= best_gain:
+                    continue
+                # friendships between the pair stay cut, see IncrementalScorer.swap_gain
+                friend_list = scorer.friend_lists[student]
+                positions = np.minimum(np.searchsorted(friend_list, others), len(friend_list) - 1)
+                gains -= 2 * (friend_list[positions] == others)
+                best = int(np.argmax(gains))
+                if gains[best] > best_gain:
+                    best_gain = int(gains[best])
+                    best_other = int(others[best])
+            if best_other is not None:
+                scorer.swap(student, best_other)
+                swaps += 1
+                swapped = True
+        if not swapped:
+            break
+    return swaps
+
+def insert_moves(buckets, scorer, student):
+    gains = scorer.move_gains(student).tolist()
+    current_bus = scorer.bus_of[student]
+    for bus_num, gain in enumerate(gains):
+        if bus_num != current_bus:
+            buckets.update((student, bus_num), gain)
+        else:
+            buckets.remove((student, bus_num))
@@ -0,0 +1,72 @@
+import html
+import numpy as np
+
+def read_gml_edges(path, keep_self_loops=False):
+    '''
+        Streams a graph.gml file in the restricted layout used by all_inputs
+
+            graph [
+              node [
+                id 0
+                label "0"
+              ]
+              edge [
+                source 0
+                target 1
+              ]
+            ]
+
+        and returns integer edge arrays instead of building a NetworkX graph.
+        Keys other than id/label on nodes and source/target on edges are skipped,
+        and self-loops are dropped in the same pass unless keep_self_loops is set.
+
+        Inputs:
+            path - a string representing the path to the graph.gml file
+            keep_self_loops - keep edges whose source and target are the same node
+
+        Outputs:
+            (labels, sources, targets)
+            labels - a list where position i is the label of node i
+            sources, targets - int32 arrays of edge endpoints as node positions
+    '''
+    labels = []
+    position = {}
+    sources = []
+    targets = []
+
+    block = None
+    node_id = None
+    node_label = None
+    source = None
+    target = None
+    with open(path) as gml:
+        for line in gml:
+            fields = line.split(None, 1)
+            if not fields:
+                continue
+            key = fields[0]
+            if key == "]":
+                if block == "node":
+                    position[node_id] = len(labels)
+                    labels.append(node_label if node_label is not None else node_id)
+                elif block == "edge" and (keep_self_loops or source != target):
+                    sources.append(source)
+                    targets.append(target)
+                block = None
+            elif len(fields) > 1 and fields[1].startswith("["):
+                block = key
+                node_id = node_label = source = target = None
+            elif block == "node":
+                if key == "id":
+                    node_id = fields[1].strip()
+                elif key == "label":
+                    node_label = html.unescape(fields[1].strip().strip('"'))
+            elif block == "edge":
+                if key == "source":
+                    source = fields[1].strip()
+                elif key == "target":
+                    target = fields[1].strip()
+
+    sources = np.fromiter((position[s] for s in sources), dtype=np.int32, count=len(sources))
+    targets = np.fromiter((position[t] for t in targets), dtype=np.int32, count=len(targets))
+    return labels, sources, targets
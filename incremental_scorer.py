@@ -0,0 +1,115 @@
+import numpy as np
+
+class IncrementalScorer:
+    '''
+        Keeps the score of a bus assignment up to date under single-student moves.
+
+        The score is the number of weight-1 edges of graph_prime whose endpoints
+        share a bus, which is what `bus_score` sums over all buses. Instead of
+        rescoring buses, the scorer maintains
+
+            intra[b]      - the number of weight-1 edges inside bus b
+            friends[s, b] - the number of weight-1 neighbors of student s on bus b
+
+        so the gain of moving a student is read in O(1) and applying the move
+        costs O(degree). Rowdy groups do not enter this proxy score; see
+        objective.ExactScorer for the graded objective.
+    '''
+
+    def __init__(self, graph_prime, assignment):
+        '''
+            Inputs:
+                graph_prime - a CompactGraph with weight 1 on scoring edges
+                assignment - an Assignment with every student seated; the scorer
+                             takes it over and moves students through it
+        '''
+        num_students = graph_prime.num_nodes
+        num_buses = assignment.num_buses
+        self.graph_prime = graph_prime
+        self.assignment = assignment
+
+        # weight-1 neighbors of every student, the only edges that ever score
+        scoring = graph_prime.weights == 1
+        self.friend_lists = [graph_prime.neighbors_of(s)[graph_prime.weights_of(s) == 1]
+                             for s in range(num_students)]
+
+        rows = np.repeat(np.arange(num_students), graph_prime.degrees())[scoring]
+        cols = graph_prime.neighbors[scoring]
+        self.friends = np.zeros((num_students, num_buses), dtype=np.int32)
+        np.add.at(self.friends, (rows, self.bus_of[cols]), 1)
+
+        same_bus = self.bus_of[rows] == self.bus_of[cols]
+        self.intra = np.bincount(self.bus_of[rows[same_bus]], minlength=num_buses) // 2
+        self.score = int(self.intra.sum())
+
+    @property
+    def bus_of(self):
+        return self.assignment.bus_of
+
+    @property
+    def sizes(self):
+        return self.assignment.sizes
+
+    @property
+    def num_buses(self):
+        return self.assignment.num_buses
+
+    def move_gain(self, student, bus_num):
+        '''
+            Returns the change in score if `student` moved to bus `bus_num`
+        '''
+        friends = self.friends[student]
+        return int(friends[bus_num] - friends[self.bus_of[student]])
+
+    def move_gains(self, student):
+        '''
+            Returns an array with the gain of moving `student` to every bus
+            (0 for the bus it is already on)
+        '''
+        friends = self.friends[student]
+        return friends - friends[self.bus_of[student]]
+
+    def move(self, student, bus_num):
+        '''
+            Moves `student` to bus `bus_num` and updates all cached counts
+        '''
+        old_bus = self.bus_of[student]
+        if old_bus == bus_num:
+            return
+        friends = self.friends[student]
+        self.intra[old_bus] -= friends[old_bus]
+        self.intra[bus_num] += friends[bus_num]
+        self.score += int(friends[bus_num] - friends[old_bus])
+
+        neighbors = self.friend_lists[student]
+        self.friends[neighbors, old_bus] -= 1
+        self.friends[neighbors, bus_num] += 1
+
+        self.assignment.move(student, bus_num)
+
+    def swap_gain(self, student, other):
+        '''
+            Returns the change in score if `student` and `other` traded buses
+        '''
+        bus_a = self.bus_of[student]
+        bus_b = self.bus_of[other]
+        if bus_a == bus_b:
+            return 0
+        gain = (self.friends[student, bus_b] - self.friends[student, bus_a]
+                + self.friends[other, bus_a] - self.friends[other, bus_b])
+        # a friendship between the two stays cut but was counted in both moves
+        if self.graph_prime.weight(student, other) == 1:
+            gain -= 2
+        return int(gain)
+
+    def swap(self, student, other):
+        '''
+            Trades the buses of `student` and `other`, keeping both bus sizes
+        '''
+        bus_a = self.bus_of[student]
+        bus_b = self.bus_of[other]
+        self.move(student, bus_b)
+        self.move(other, bus_a)
+
+    def bus_score(self, bus_num):
+        return int(self.intra[bus_num])
@@ -0,0 +1,50 @@
+class Incumbent:
+    '''
+        The best feasible assignment found so far for one instance.
+
+        Assignments are offered with their score and only kept when they beat
+        the current one and are feasible: every student seated and every bus
+        holding between 1 and size_bus students. The kept solution is stored as
+        a list of buses of student labels, so later moves of the offered
+        assignment do not change it, and handed to `on_improvement` together
+        with its score (e.g. to checkpoint it to the .out file) every time it
+        changes.
+    '''
+
+    def __init__(self, graph, size_bus, on_improvement=None, score=None):
+        '''
+            Inputs:
+                graph - the CompactGraph of the instance, used for the labels
+                size_bus - the capacity of every bus
+                on_improvement - optional callback given each new best solution
+                                 and its score
+                score - optional score an assignment has to beat, e.g. that of
+                        a solution already on disk
+        '''
+        self.graph = graph
+        self.size_bus = size_bus
+        self.on_improvement = on_improvement
+        self.score = score
+        self.solution = None
+
+    def feasible(self, assignment):
+        sizes = assignment.sizes
+        return bool((assignment.bus_of >= 0).all() and (sizes >= 1).all() and (sizes <= self.size_bus).all())
+
+    def offer(self, score, assignment):
+        '''
+            Keeps the assignment if it is feasible and scores higher than the
+            current best
+
+            Outputs:
+                whether the assignment was kept
+        '''
+        if self.score is not None and score <= self.score:
+            return False
+        if not self.feasible(assignment):
+            return False
+        self.score = score
+        self.solution = [self.graph.labels_of(bus) for bus in assignment.buses()]
+        if self.on_improvement is not None:
+            self.on_improvement(self.solution, score)
+        return True
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import numpy as np
+from compact_graph import CompactGraph
+
+###########################################
+# Change this variable if you want the
+# preprocessed instances to be cached
+# in a different folder
+###########################################
+path_to_cache = "./cache"
+
+# Bump whenever parse_input or build_graph_prime change what they produce, so
+# entries written by older code are not picked up
+cache_version = 4
+
+def cache_key(folder_name):
+    return content_hash(folder_name, str(cache_version))
+
+def content_hash(folder_name, salt=""):
+    '''
+        Returns a content hash of an input folder's graph.gml and parameters.txt,
+        optionally salted (the cache salts it with cache_version)
+    '''
+    digest = hashlib.sha256(salt.encode())
+    for file_name in ("graph.gml", "parameters.txt"):
+        with open(folder_name + "/" + file_name, "rb") as input_file:
+            for chunk in iter(lambda: input_file.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(key):
+    return path_to_cache + "/" + key + ".npz"
+
+def load(folder_name):
+    '''
+        Loads a preprocessed instance from the cache
+
+        Inputs:
+            folder_name - a string representing the path to the input folder
+
+        Outputs:
+            (graph, num_buses, size_bus, constraints, graph_prime) as produced by
+            parse_input and build_graph_prime, or None if the folder's current
+            contents have not been cached
+    '''
+    path = cache_path(cache_key(folder_name))
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as cached:
+        labels = cached["labels"].tolist()
+        graph = CompactGraph(labels, cached["offsets"], cached["neighbors"], cached["weights"],
+                             cached["self_loops"])
+        graph_prime = graph.overlay(cached["prime_weights"])
+        num_buses = int(cached["num_buses"])
+        size_bus = int(cached["size_bus"])
+        members = cached["rowdy_members"].tolist()
+        group_offsets = cached["rowdy_offsets"].tolist()
+    constraints = [graph.labels_of(members[group_offsets[i]:group_offsets[i + 1]])
+                   for i in range(len(group_offsets) - 1)]
+    return graph, num_buses, size_bus, constraints, graph_prime
+
+def store(folder_name, graph, num_buses, size_bus, constraints, graph_prime):
+    '''
+        Writes a preprocessed instance to the cache under its content hash
+
+        The file is written next to its final name and renamed into place, so
+        concurrent workers never read a partial cache entry.
+    '''
+    if not os.path.isdir(path_to_cache):
+        os.makedirs(path_to_cache, exist_ok=True)
+    path = cache_path(cache_key(folder_name))
+    members = [student for rowdy_list in constraints for student in graph.ids(rowdy_list)]
+    group_offsets = np.cumsum([0] + [len(rowdy_list) for rowdy_list in constraints])
+
+    temp_path = path + ".{}.tmp".format(os.getpid())
+    with open(temp_path, "wb") as cache_file:
+        np.savez(cache_file,
+                 labels=np.array(graph.labels, dtype=str),
+                 offsets=graph.offsets, neighbors=graph.neighbors, weights=graph.weights,
+                 self_loops=graph.self_loops,
+                 prime_weights=graph_prime.weights,
+                 num_buses=num_buses, size_bus=size_bus,
+                 rowdy_members=np.array(members, dtype=np.int32),
+                 rowdy_offsets=group_offsets.astype(np.int64))
+    os.replace(temp_path, path)
@@ -0,0 +1,176 @@
+import numpy as np
+from assignment import Assignment
+
+class Propagation:
+    '''
+        The arrays one label propagation run works on: the scoring edges of G'
+        as parallel `rows`, `cols` arrays (both directions) and the rowdy groups
+        as flattened by their RowdyIndex into `group_ids`, `members` and
+        `group_sizes`.
+    '''
+
+    def __init__(self, graph_prime, num_buses, rowdy_index, rowdy_penalty):
+        self.num_students = graph_prime.num_nodes
+        self.num_buses = num_buses
+        scoring = graph_prime.weights == 1
+        self.rows = np.repeat(np.arange(self.num_students), graph_prime.degrees())[scoring]
+        self.cols = graph_prime.neighbors[scoring].astype(np.int64)
+        self.group_sizes = rowdy_index.group_sizes
+        self.group_ids = rowdy_index.group_ids
+        self.members = rowdy_index.members
+        if rowdy_penalty is None:
+            rowdy_penalty = len(self.rows) / max(self.num_students, 1)
+        self.rowdy_penalty = rowdy_penalty
+
+    def preferences(self, bus_of):
+        '''
+            Scores every (student, bus) pair in one batch: weight-1 friends seated
+            on the bus, minus rowdy_penalty for every rowdy group the student would
+            leave complete on it. Unseated students (bus -1) count for no bus.
+
+            Outputs:
+                a num_students x num_buses float array
+        '''
+        preference = np.zeros((self.num_students, self.num_buses))
+        friend_buses = bus_of[self.cols]
+        seated = friend_buses >= 0
+        np.add.at(preference, (self.rows[seated], friend_buses[seated]), 1)
+        if len(self.members) == 0:
+            return preference
+
+        # group_counts[g, b]: seated members of group g on bus b
+        group_counts = np.zeros((len(self.group_sizes), self.num_buses), dtype=np.int64)
+        member_buses = bus_of[self.members]
+        seated = member_buses >= 0
+        np.add.at(group_counts, (self.group_ids[seated], member_buses[seated]), 1)
+        # a student joining bus b completes g when every other member is there;
+        # staying on its own bus keeps g complete when every member is there
+        completes = (group_counts == (self.group_sizes - 1)[:, None]).astype(np.float64)
+        stays_complete = (group_counts == self.group_sizes[:, None]).astype(np.float64)
+        joining = np.zeros((self.num_students, self.num_buses))
+        staying = np.zeros((self.num_students, self.num_buses))
+        np.add.at(joining, self.members, completes[self.group_ids])
+        np.add.at(staying, self.members, stays_complete[self.group_ids])
+        own = np.zeros((self.num_students, self.num_buses), dtype=bool)
+        seated = np.flatnonzero(bus_of >= 0)
+        own[seated, bus_of[seated]] = True
+        return preference - self.rowdy_penalty * np.where(own, staying, joining)
+
+def pick_seeds(graph_prime, num_buses):
+    '''
+        One seed student per bus: the highest-degree students that are not
+        friends with an earlier seed, topped up by degree when there are too few
+    '''
+    order = np.argsort(-graph_prime.degrees(), kind="stable").tolist()
+    seeds = []
+    covered = np.zeros(graph_prime.num_nodes, dtype=bool)
+    for student in order:
+        if len(seeds) == num_buses:
+            break
+        if not covered[student]:
+            seeds.append(student)
+            covered[student] = True
+            covered[graph_prime.neighbors_of(student)] = True
+    chosen = set(seeds)
+    for student in order:
+        if len(seeds) == num_buses:
+            break
+        if student not in chosen:
+            seeds.append(student)
+            chosen.add(student)
+    return seeds
+
+def accept(candidates, targets, gains, bus_of, sizes, size_bus):
+    '''
+        Applies the proposed moves in order of decreasing gain while the target
+        bus has room and the source bus keeps at least one student
+
+        Outputs:
+            the number of accepted moves
+    '''
+    accepted = 0
+    for student in candidates[np.argsort(-gains[candidates], kind="stable")].tolist():
+        old_bus, bus_num = bus_of[student], targets[student]
+        if sizes[bus_num] >= size_bus or (old_bus >= 0 and sizes[old_bus] <= 1):
+            continue
+        if old_bus >= 0:
+            sizes[old_bus] -= 1
+        bus_of[student] = bus_num
+        sizes[bus_num] += 1
+        accepted += 1
+    return accepted
+
+def label_propagation_partition(graph_prime, num_buses, size_bus, rowdy_index, rowdy_penalty=None,
+                                max_rounds=30, seed=0):
+    '''
+        Capacity-constrained label propagation
+
+        One seed student is placed on every bus. While students are unseated,
+        each round seats the unseated students that have a friend on some bus
+        onto the bus they prefer; when none has, the most popular unseated
+        students start new groups on the emptiest buses. Refinement rounds
+        then let every student adopt the bus it prefers to its own. Each round
+        scores all (student, bus) pairs in one vectorized batch over the
+        adjacency arrays (see Propagation.preferences) and accepts the
+        proposals in order of decreasing gain under size_bus, never emptying
+        a bus.
+
+        Inputs:
+            graph_prime - a CompactGraph with weight 1 on scoring edges
+            num_buses, size_bus - the bus parameters
+            rowdy_index - the RowdyIndex of the instance
+            rowdy_penalty - cost of a complete rowdy group, the average degree by default
+            max_rounds - upper bound on the number of refinement rounds
+            seed - seed for the tie-breaking noise, fixed by default so runs are reproducible
+
+        Outputs:
+            an Assignment with every bus within size_bus, and non-empty when
+            there are at least num_buses students
+    '''
+    rng = np.random.default_rng(seed)
+    propagation = Propagation(graph_prime, num_buses, rowdy_index, rowdy_penalty)
+    num_students = graph_prime.num_nodes
+    students = np.arange(num_students)
+    degrees = np.bincount(propagation.rows, minlength=num_students)
+
+    bus_of = np.full(num_students, -1, dtype=np.int64)
+    seeds = pick_seeds(graph_prime, num_buses)
+    bus_of[seeds] = np.arange(len(seeds))
+    sizes = np.bincount(bus_of[seeds], minlength=num_buses)
+
+    #Growth: seat unseated students next to their seated friends
+    while (bus_of == -1).any():
+        preference = propagation.preferences(bus_of)
+        # small random noise breaks ties without favoring low bus numbers
+        preference += rng.uniform(0, 1e-3, preference.shape)
+        preference[:, sizes >= size_bus] = -np.inf
+        targets = np.argmax(preference, axis=1)
+        gains = preference[students, targets]
+        candidates = np.flatnonzero((bus_of == -1) & (gains >= 1))
+        if len(candidates) and accept(candidates, targets, gains, bus_of, sizes, size_bus):
+            continue
+        # no unseated student has a seated friend: start new components, the
+        # most popular unseated students each on one of the emptiest buses
+        unseated = np.flatnonzero(bus_of == -1)
+        starters = unseated[np.argsort(-degrees[unseated], kind="stable")]
+        if degrees[starters[0]] > 0:
+            starters = starters[:np.count_nonzero(sizes < size_bus)]
+        for student in starters.tolist():
+            bus_num = int(np.argmin(sizes))
+            bus_of[student] = bus_num
+            sizes[bus_num] += 1
+
+    #Refinement: every student may adopt the bus it prefers to its own
+    for _ in range(max_rounds):
+        preference = propagation.preferences(bus_of)
+        preference += rng.uniform(0, 1e-3, preference.shape)
+        targets = np.argmax(np.where(sizes < size_bus, preference, -np.inf), axis=1)
+        gains = preference[students, targets] - preference[students, bus_of]
+        candidates = np.flatnonzero((targets != bus_of) & (gains > 1e-2))
+        if len(candidates) == 0 or not accept(candidates, targets, gains, bus_of, sizes, size_bus):
+            break
+
+    assignment = Assignment(num_students, num_buses)
+    for student, bus_num in enumerate(bus_of.tolist()):
+        assignment.assign(student, bus_num)
+    return assignment
@@ -0,0 +1,219 @@
+import numpy as np
+from assignment import Assignment
+
+class Level:
+    '''
+        One graph of the coarsening hierarchy.
+
+        Vertices carry weights (how many students they stand for) and edges are
+        stored once per direction as parallel arrays `sources`, `targets`,
+        `weights` (how many friendships they stand for). `fine_to_coarse` maps
+        the vertices of the next finer level onto this one.
+    '''
+
+    def __init__(self, vertex_weights, sources, targets, weights, fine_to_coarse=None):
+        self.vertex_weights = vertex_weights
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+        self.fine_to_coarse = fine_to_coarse
+
+    @property
+    def num_vertices(self):
+        return len(self.vertex_weights)
+
+    def adjacency(self):
+        '''
+            Returns (offsets, neighbors, weights) in CSR form
+        '''
+        order = np.argsort(self.sources, kind="stable")
+        offsets = np.zeros(self.num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sources, minlength=self.num_vertices), out=offsets[1:])
+        return offsets, self.targets[order], self.weights[order]
+
+def heavy_edge_matching(level, size_bus, rng):
+    '''
+        Matches every vertex with the unmatched neighbor it shares the heaviest
+        edge with, as long as the pair still fits on one bus
+
+        Outputs:
+            (fine_to_coarse, num_coarse) - the coarse vertex of every vertex
+    '''
+    offsets, neighbors, weights = level.adjacency()
+    vertex_weights = level.vertex_weights
+    fine_to_coarse = np.full(level.num_vertices, -1, dtype=np.int64)
+    num_coarse = 0
+    for vertex in rng.permutation(level.num_vertices).tolist():
+        if fine_to_coarse[vertex] != -1:
+            continue
+        start, end = offsets[vertex], offsets[vertex + 1]
+        candidates = neighbors[start:end]
+        fits = (fine_to_coarse[candidates] == -1) & \
+            (vertex_weights[candidates] + vertex_weights[vertex] <= size_bus)
+        fine_to_coarse[vertex] = num_coarse
+        if fits.any():
+            mate = candidates[fits][np.argmax(weights[start:end][fits])]
+            fine_to_coarse[mate] = num_coarse
+        num_coarse += 1
+    return fine_to_coarse, num_coarse
+
+def coarsen(level, size_bus, rng):
+    '''
+        Contracts a matching of `level` into the next coarser Level
+    '''
+    fine_to_coarse, num_coarse = heavy_edge_matching(level, size_bus, rng)
+    vertex_weights = np.bincount(fine_to_coarse, weights=level.vertex_weights,
+                                 minlength=num_coarse).astype(np.int64)
+    sources = fine_to_coarse[level.sources]
+    targets = fine_to_coarse[level.targets]
+    keep = sources != targets
+    keys, inverse = np.unique(sources[keep] * num_coarse + targets[keep], return_inverse=True)
+    weights = np.bincount(inverse, weights=level.weights[keep], minlength=len(keys)).astype(np.int64)
+    return Level(vertex_weights, keys // num_coarse, keys % num_coarse, weights, fine_to_coarse)
+
+def initial_partition(level, num_buses, size_bus):
+    '''
+        Greedy graph growing on the coarsest level: heaviest vertices first, each
+        onto the part it is most connected to among those it fits in, the
+        lightest part on ties. A vertex that fits nowhere goes to the lightest
+        part and is repaired by `rebalance` later.
+    '''
+    offsets, neighbors, weights = level.adjacency()
+    part_of = np.full(level.num_vertices, -1, dtype=np.int64)
+    part_weights = np.zeros(num_buses, dtype=np.int64)
+    for vertex in np.argsort(-level.vertex_weights, kind="stable").tolist():
+        start, end = offsets[vertex], offsets[vertex + 1]
+        placed = part_of[neighbors[start:end]] >= 0
+        connection = np.bincount(part_of[neighbors[start:end]][placed], weights=weights[start:end][placed],
+                                 minlength=num_buses)
+        fits = part_weights + level.vertex_weights[vertex] <= size_bus
+        if fits.any():
+            # prefer connection, then an empty part, then the lightest part
+            score = np.where(fits, connection * (size_bus + 1) - part_weights, -np.inf)
+            part = int(np.argmax(score))
+        else:
+            part = int(np.argmin(part_weights))
+        part_of[vertex] = part
+        part_weights[part] += level.vertex_weights[vertex]
+    return part_of
+
+def connections(level, part_of, num_buses):
+    '''
+        Returns the vertices x parts matrix of edge weight from each vertex to each part
+    '''
+    connection = np.zeros((level.num_vertices, num_buses), dtype=np.int64)
+    np.add.at(connection, (level.sources, part_of[level.targets]), level.weights)
+    return connection
+
+def rebalance(level, part_of, num_buses, size_bus):
+    '''
+        Moves vertices out of parts above size_bus, each time the vertex of an
+        overfull part that loses the least connection and fits elsewhere
+    '''
+    part_weights = np.bincount(part_of, weights=level.vertex_weights, minlength=num_buses).astype(np.int64)
+    if (part_weights <= size_bus).all():
+        return
+    connection = connections(level, part_of, num_buses)
+    vertices = np.arange(level.num_vertices)
+    while (part_weights > size_bus).any():
+        over = part_weights[part_of] > size_bus
+        room = size_bus - part_weights
+        fits = level.vertex_weights[:, None] <= room[None, :]
+        losses = np.where(fits & over[:, None],
+                          connection[vertices, part_of][:, None] - connection, np.iinfo(np.int64).max)
+        if (losses == np.iinfo(np.int64).max).all():
+            return
+        vertex, part = divmod(int(np.argmin(losses)), num_buses)
+        move_vertex(level, connection, part_of, part_weights, vertex, part)
+
+def move_vertex(level, connection, part_of, part_weights, vertex, part):
+    old_part = part_of[vertex]
+    mask = level.sources == vertex
+    np.add.at(connection, (level.targets[mask], old_part), -level.weights[mask])
+    np.add.at(connection, (level.targets[mask], part), level.weights[mask])
+    part_weights[old_part] -= level.vertex_weights[vertex]
+    part_weights[part] += level.vertex_weights[vertex]
+    part_of[vertex] = part
+
+def refine(level, part_of, num_buses, size_bus, max_passes=10):
+    '''
+        Greedy boundary refinement of one level: every vertex moves to the part
+        it is most connected to if that strictly increases the in-part edge
+        weight and fits under size_bus, until a pass moves nothing
+    '''
+    offsets, neighbors, weights = level.adjacency()
+    part_weights = np.bincount(part_of, weights=level.vertex_weights, minlength=num_buses).astype(np.int64)
+    connection = connections(level, part_of, num_buses)
+    for _ in range(max_passes):
+        moved = False
+        for vertex in range(level.num_vertices):
+            old_part = part_of[vertex]
+            gains = connection[vertex] - connection[vertex, old_part]
+            fits = part_weights + level.vertex_weights[vertex] <= size_bus
+            # never empty a part, every bus needs at least one student
+            if part_weights[old_part] == level.vertex_weights[vertex]:
+                continue
+            gains = np.where(fits, gains, 0)
+            part = int(np.argmax(gains))
+            if gains[part] <= 0:
+                continue
+            start, end = offsets[vertex], offsets[vertex + 1]
+            connection[neighbors[start:end], old_part] -= weights[start:end]
+            connection[neighbors[start:end], part] += weights[start:end]
+            part_weights[old_part] -= level.vertex_weights[vertex]
+            part_weights[part] += level.vertex_weights[vertex]
+            part_of[vertex] = part
+            moved = True
+        if not moved:
+            break
+
+def multilevel_partition(graph_prime, num_buses, size_bus, coarsest_size=None, seed=0):
+    '''
+        Multilevel (METIS-like) assignment of students to buses
+
+        The scoring edges of graph_prime (weight 1) are coarsened by heavy-edge
+        matching while tracking how many students each coarse vertex stands for,
+        never building a vertex that would not fit on a bus. The coarsest graph
+        is partitioned into num_buses parts under the size_bus cap, and the
+        partition is projected back level by level with rebalancing and greedy
+        refinement at each one.
+
+        Inputs:
+            graph_prime - a CompactGraph with weight 1 on scoring edges
+            num_buses, size_bus - the bus parameters
+            coarsest_size - stop coarsening at this many vertices, 2 * num_buses by default
+            seed - seed for the matching order, fixed by default so runs are reproducible
+
+        Outputs:
+            an Assignment; buses are within size_bus but may still be empty when
+            there are fewer coarse vertices than buses
+    '''
+    rng = np.random.default_rng(seed)
+    if coarsest_size is None:
+        coarsest_size = 2 * num_buses
+    sources, targets, weights = graph_prime.edges()
+    scoring = weights == 1
+    sources = sources[scoring].astype(np.int64)
+    targets = targets[scoring].astype(np.int64)
+    levels = [Level(np.ones(graph_prime.num_nodes, dtype=np.int64),
+                    np.concatenate((sources, targets)), np.concatenate((targets, sources)),
+                    np.ones(2 * len(sources), dtype=np.int64))]
+    while levels[-1].num_vertices > coarsest_size:
+        coarse = coarsen(levels[-1], size_bus, rng)
+        # stop once matching no longer shrinks the graph meaningfully
+        if coarse.num_vertices > 0.95 * levels[-1].num_vertices:
+            break
+        levels.append(coarse)
+
+    part_of = initial_partition(levels[-1], num_buses, size_bus)
+    rebalance(levels[-1], part_of, num_buses, size_bus)
+    refine(levels[-1], part_of, num_buses, size_bus)
+    for depth in range(len(levels) - 1, 0, -1):
+        part_of = part_of[levels[depth].fine_to_coarse]
+        rebalance(levels[depth - 1], part_of, num_buses, size_bus)
+        refine(levels[depth - 1], part_of, num_buses, size_bus)
+
+    assignment = Assignment(graph_prime.num_nodes, num_buses)
+    for student, bus_num in enumerate(part_of.tolist()):
+        assignment.assign(student, bus_num)
+    return assignment
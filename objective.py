@@ -0,0 +1,359 @@
+import sys
+import time
+import numpy as np
+from assignment import Assignment
+from rowdy_index import RowdyTracker
+
+####################################################
+# The objective graded by output_scorer, evaluated on the integer graph core:
+# every friendship of G (weight 1 or 2 in G', plus self-loops) whose two
+# students share a bus counts, except that the members of a rowdy group left
+# entirely on one bus lose all of their friendships. The score is that count
+# over the number of friendships in G.
+#
+# To cross-check against output_scorer:
+#   python3 objective.py <input_folder> <output_file> [<output_file> ...]
+####################################################
+
+def removed_students(rowdy_index, bus_of):
+    '''
+        Returns a boolean array of the students in some rowdy group that is
+        entirely on one bus
+    '''
+    tracker = RowdyTracker(rowdy_index, bus_of, int(bus_of.max()) + 1 if len(bus_of) else 0)
+    removed = np.zeros(len(bus_of), dtype=bool)
+    removed[rowdy_index.members[tracker.complete[rowdy_index.group_ids]]] = True
+    return removed
+
+def exact_score(graph_prime, rowdy_index, bus_of):
+    '''
+        Full evaluation of the graded objective
+
+        Inputs:
+            graph_prime - G' as built by build_graph_prime, with every edge of G
+            rowdy_index - the RowdyIndex of the instance
+            bus_of - the bus of every student, all of them seated
+
+        Outputs:
+            the number of friendships output_scorer counts for this assignment
+    '''
+    sources, targets, _ = graph_prime.edges()
+    kept = ~removed_students(rowdy_index, bus_of)
+    same_bus = (bus_of[sources] == bus_of[targets]) & kept[sources] & kept[targets]
+    return int(np.count_nonzero(same_bus)) + int(np.count_nonzero(graph_prime.self_loops & kept))
+
+def total_friendships(graph_prime):
+    return graph_prime.num_edges + graph_prime.num_self_loops
+
+def upper_bound(graph_prime, size_bus):
+    '''
+        Returns an upper bound on exact_score over all assignments: a student
+        keeps at most size_bus - 1 friendships on its bus, and every kept
+        friendship is counted from both of its students
+    '''
+    kept_per_student = np.minimum(graph_prime.degrees(), size_bus - 1)
+    bound = int(kept_per_student.sum()) // 2 + graph_prime.num_self_loops
+    return min(bound, total_friendships(graph_prime))
+
+def exact_fraction(graph_prime, rowdy_index, bus_of):
+    '''
+        Returns the score output_scorer reports for this assignment
+    '''
+    return exact_score(graph_prime, rowdy_index, bus_of) / total_friendships(graph_prime)
+
+class ExactScorer:
+    '''
+        Keeps the graded objective of a bus assignment up to date under moves
+        and swaps, with the same interface as IncrementalScorer so optimizers
+        such as simulated_annealing can steer by it directly.
+
+            kept[s]       - whether student s is in no complete rowdy group
+            friends[s, b] - the number of kept friends (weight 1 or 2) of s on bus b
+            score         - the number of friendships between kept students
+                            sharing a bus, self-loops included
+
+        A move that completes or breaks no rowdy group changes the score by
+        friends[s, b] - friends[s, a] (or not at all for a student that is not
+        kept), read in O(1). A move that does costs O(degree) for every member
+        whose kept status flips; the RowdyTracker tells which case applies in
+        O(groups-per-student).
+    '''
+
+    def __init__(self, graph_prime, assignment, rowdy_index):
+        '''
+            Inputs:
+                graph_prime - G' as built by build_graph_prime, with every edge of G
+                assignment - an Assignment with every student seated; the scorer
+                             takes it over and moves students through it
+                rowdy_index - the RowdyIndex of the instance
+        '''
+        num_students = graph_prime.num_nodes
+        num_buses = assignment.num_buses
+        self.graph_prime = graph_prime
+        self.assignment = assignment
+        self.rowdy_index = rowdy_index
+        self.rowdy = RowdyTracker(rowdy_index, self.bus_of, num_buses)
+        self.neighbor_lists = [graph_prime.neighbors_of(s) for s in range(num_students)]
+        self.self_loops = graph_prime.self_loops.astype(np.int64)
+
+        self.removed_count = np.zeros(num_students, dtype=np.int64)
+        np.add.at(self.removed_count, rowdy_index.members, self.rowdy.complete[rowdy_index.group_ids])
+        self.kept = self.removed_count == 0
+
+        rows = np.repeat(np.arange(num_students), graph_prime.degrees())
+        cols = graph_prime.neighbors
+        self.friends = np.zeros((num_students, num_buses), dtype=np.int32)
+        np.add.at(self.friends, (rows, self.bus_of[cols]), self.kept[cols])
+        self.score = exact_score(graph_prime, rowdy_index, self.bus_of)
+        self.total = total_friendships(graph_prime)
+
+    @property
+    def bus_of(self):
+        return self.assignment.bus_of
+
+    @property
+    def sizes(self):
+        return self.assignment.sizes
+
+    @property
+    def num_buses(self):
+        return self.assignment.num_buses
+
+    @property
+    def fraction(self):
+        return self.score / self.total if self.total else 0.0
+
+    def group_events(self, student, bus_num):
+        '''
+            Returns (completed, broken), the rowdy groups moving `student` to
+            bus `bus_num` would complete and break up
+        '''
+        groups = self.rowdy_index.groups_of(student)
+        group_sizes = self.rowdy_index.group_sizes[groups]
+        complete = self.rowdy.complete[groups]
+        # a one-member group is complete wherever its member sits
+        completed = groups[(self.rowdy.counts[groups, bus_num] + 1 == group_sizes) & ~complete]
+        broken = groups[complete & (group_sizes > 1)]
+        return completed, broken
+
+    def move_gain(self, student, bus_num):
+        '''
+            Returns the change in score if `student` moved to bus `bus_num`
+        '''
+        old_bus = self.bus_of[student]
+        if old_bus == bus_num:
+            return 0
+        completed, broken = self.group_events(student, bus_num)
+        if len(completed) == 0 and len(broken) == 0:
+            if not self.kept[student]:
+                return 0
+            friends = self.friends[student]
+            return int(friends[bus_num] - friends[old_bus])
+        score = self.score
+        self.move(student, bus_num)
+        gain = self.score - score
+        self.move(student, old_bus)
+        return gain
+
+    def move_gains(self, student):
+        '''
+            Returns an array with the gain of moving `student` to every bus
+            (0 for the bus it is already on). Only the buses where the move
+            would complete a rowdy group are evaluated move by move.
+
+            The groups a move breaks are the same whichever bus the student
+            goes to, so their members are restored once, with the student
+            still on its bus, to read what breaking them is worth and the
+            student's friend counts afterwards, and then removed again.
+        '''
+        old_bus = self.bus_of[student]
+        groups = self.rowdy_index.groups_of(student)
+        group_sizes = self.rowdy_index.group_sizes[groups]
+        complete = self.rowdy.complete[groups]
+        broken = groups[complete & (group_sizes > 1)].tolist()
+
+        score = self.score
+        for group in broken:
+            for member in self.rowdy_index.members_of(group).tolist():
+                self.restore(member)
+        broken_gain = self.score - score
+        friends = self.friends[student].copy()
+        kept = self.kept[student]
+        for group in broken:
+            for member in self.rowdy_index.members_of(group).tolist():
+                self.remove(member)
+
+        gains = friends - friends[old_bus] if kept else np.zeros(self.num_buses, dtype=np.int64)
+        gains += broken_gain
+        gains[old_bus] = 0
+        if len(groups) == 0:
+            return gains
+        eventful = ((self.rowdy.counts[groups] + 1 == group_sizes[:, None]) & ~complete[:, None]).any(axis=0)
+        eventful[old_bus] = False
+        for bus_num in np.flatnonzero(eventful).tolist():
+            gains[bus_num] = self.move_gain(student, bus_num)
+        return gains
+
+    def move(self, student, bus_num):
+        '''
+            Moves `student` to bus `bus_num` and updates all cached counts
+        '''
+        old_bus = self.bus_of[student]
+        if old_bus == bus_num:
+            return
+        completed, broken = self.group_events(student, bus_num)
+        if self.kept[student]:
+            friends = self.friends[student]
+            self.score += int(friends[bus_num] - friends[old_bus])
+            neighbors = self.neighbor_lists[student]
+            self.friends[neighbors, old_bus] -= 1
+            self.friends[neighbors, bus_num] += 1
+        self.rowdy.move(student, old_bus, bus_num)
+        self.assignment.move(student, bus_num)
+
+        for group in broken.tolist():
+            for member in self.rowdy_index.members_of(group).tolist():
+                self.restore(member)
+        for group in completed.tolist():
+            for member in self.rowdy_index.members_of(group).tolist():
+                self.remove(member)
+
+    def remove(self, student):
+        self.removed_count[student] += 1
+        if self.removed_count[student] > 1:
+            return
+        bus_num = self.bus_of[student]
+        self.kept[student] = False
+        self.score -= int(self.friends[student, bus_num] + self.self_loops[student])
+        self.friends[self.neighbor_lists[student], bus_num] -= 1
+
+    def restore(self, student):
+        self.removed_count[student] -= 1
+        if self.removed_count[student] > 0:
+            return
+        bus_num = self.bus_of[student]
+        self.kept[student] = True
+        self.score += int(self.friends[student, bus_num] + self.self_loops[student])
+        self.friends[self.neighbor_lists[student], bus_num] += 1
+
+    def swap_gain(self, student, other):
+        '''
+            Returns the change in score if `student` and `other` traded buses
+        '''
+        bus_a = self.bus_of[student]
+        bus_b = self.bus_of[other]
+        if bus_a == bus_b:
+            return 0
+        rowdy = self.rowdy
+        # with no group completed or broken by either move in isolation, no group
+        # changes status in the swap and both students are kept
+        if (len(rowdy.broken_by(student)) == 0 and len(rowdy.broken_by(other)) == 0
+                and len(rowdy.completed_by(student, bus_b)) == 0 and len(rowdy.completed_by(other, bus_a)) == 0):
+            gain = (self.friends[student, bus_b] - self.friends[student, bus_a]
+                    + self.friends[other, bus_a] - self.friends[other, bus_b])
+            if self.graph_prime.has_edge(student, other):
+                gain -= 2
+            return int(gain)
+        score = self.score
+        self.swap(student, other)
+        gain = self.score - score
+        self.swap(student, other)
+        return gain
+
+    def swap(self, student, other):
+        '''
+            Trades the buses of `student` and `other`, keeping both bus sizes
+        '''
+        bus_a = self.bus_of[student]
+        bus_b = self.bus_of[other]
+        self.move(student, bus_b)
+        self.move(other, bus_a)
+
+def exact_refine(scorer, size_bus, max_passes=20, swap_candidates=None, deadline=None, should_stop=None):
+    '''
+        Hill climbing on the graded objective: every student moves to the bus
+        with the best positive exact gain among those with room (never emptying
+        its own), and when the best bus by gain is full, trades places with a
+        member of that bus. Partners are ranked by the swap gain their friend
+        counts suggest and evaluated exactly in that order; the first with a
+        positive exact gain is taken.
+
+        Inputs:
+            scorer - an ExactScorer holding a feasible assignment, improved in place
+            size_bus - the capacity of every bus
+            max_passes - upper bound on the number of passes over the students
+            swap_candidates - optional cap on the partners evaluated per attempted swap
+            deadline - optional time.time() at which to stop
+            should_stop - optional callback, checked with the deadline, that stops
+                          the climb when it returns True
+
+        Outputs:
+            the number of moves and swaps applied
+    '''
+    applied = 0
+    for _ in range(max_passes):
+        improved = False
+        for student in range(len(scorer.bus_of)):
+            if (deadline is not None and time.time() >= deadline) or (should_stop is not None and should_stop()):
+                return applied
+            old_bus = scorer.bus_of[student]
+            gains = scorer.move_gains(student)
+            gains[old_bus] = 0
+            movable = (scorer.sizes < size_bus) & (scorer.sizes[old_bus] > 1)
+            open_gains = np.where(movable, gains, 0)
+            bus_num = int(np.argmax(open_gains))
+            if open_gains[bus_num] > 0:
+                scorer.move(student, bus_num)
+                applied += 1
+                improved = True
+                continue
+            full_gains = np.where(scorer.sizes >= size_bus, gains, 0)
+            bus_num = int(np.argmax(full_gains))
+            if full_gains[bus_num] <= 0:
+                continue
+            partners = np.fromiter(scorer.assignment.members[bus_num], dtype=np.int64)
+            estimates = scorer.friends[partners, old_bus] - scorer.friends[partners, bus_num]
+            for partner in partners[np.argsort(-estimates, kind="stable")[:swap_candidates]].tolist():
+                if scorer.swap_gain(student, partner) > 0:
+                    scorer.swap(student, partner)
+                    applied += 1
+                    improved = True
+                    break
+        if not improved:
+            break
+    return applied
+
+def main():
+    '''
+        Scores .out files with the exact evaluator and with
+        output_scorer.score_output_fast, printing both and whether they agree
+    '''
+    from output_scorer import score_output_fast
+    from solver import build_graph_prime, build_rowdy_index, parse_input
+
+    if len(sys.argv) < 3:
+        print("usage: python3 objective.py <input_folder> <output_file> [<output_file> ...]")
+        sys.exit(1)
+    input_folder = sys.argv[1]
+    graph, num_buses, size_bus, constraints = parse_input(input_folder)
+    graph_prime = build_graph_prime(graph, constraints)
+    rowdy_index = build_rowdy_index(graph, constraints)
+    mismatches = 0
+    for output_file in sys.argv[2:]:
+        reference, msg = score_output_fast(input_folder, output_file)
+        if reference == -1:
+            print(output_file, msg)
+            continue
+        buses = []
+        for line in open(output_file):
+            line = line[1: -2]
+            buses.append(graph.ids([node.replace("'", "") for node in line.split(", ")]))
+        assignment = Assignment.from_buses(graph.num_nodes, buses)
+        score = exact_fraction(graph_prime, rowdy_index, assignment.bus_of)
+        match = score == reference
+        mismatches += not match
+        print(output_file, score, reference, "ok" if match else "MISMATCH")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,25 @@
 import os
 import sys
-import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
+from gml_reader import read_gml_edges
 
 ####################################################
 # To run:
-#   python3 output_scorer.py <input_folder> <output_file>
+#   python3 output_scorer.py [--reference] <input_folder> <output_file>
 #
 #   input_folder - the path to the input folder
 #   output_file - the path to the output file
+#   --reference - score with the original NetworkX implementation instead of
+#                 the NumPy one (same result, much slower to start and run)
 #
 # Examples:
 #   python3 output_scorer.py ./inputs/small/12 ./outputs/small/12.out
+#
+# To score every output at once:
+#   python3 output_scorer.py --batch <inputs_root> <outputs_root> [--workers N]
+#
+#   inputs_root - the folder containing the size category input folders
+#   outputs_root - the folder containing the size category output folders
 ####################################################
 
 def score_output(input_folder, output_file):
@@ -27,6 +35,9 @@ def score_output(input_folder, output_file):
             score - a number between 0 and 1 which represents what fraction of friendships were broken
             msg - a string which stores error messages in case the output file is not valid for the given input
     '''
+    # NetworkX is only needed by this reference implementation, keep it off the default path
+    import networkx as nx
+
     graph = nx.read_gml(input_folder + "/graph.gml")
     parameters = open(input_folder + "/parameters.txt")
     num_buses = int(parameters.readline())
@@ -98,6 +109,138 @@ def score_output(input_folder, output_file):
 
     return score, "Valid output submitted with score: {}".format(score)
 
+def score_output_fast(input_folder, output_file):
+    '''
+        Same checks and score as score_output, computed with NumPy over the
+        edge arrays of graph.gml instead of a NetworkX graph
+
+        Outputs:
+            (score, msg) exactly as returned by score_output
+    '''
+    labels, sources, targets = read_gml_edges(input_folder + "/graph.gml", keep_self_loops=True)
+    index = {label: i for i, label in enumerate(labels)}
+    parameters = open(input_folder + "/parameters.txt")
+    num_buses = int(parameters.readline())
+    size_bus = int(parameters.readline())
+    constraints = []
+
+    for line in parameters:
+        line = line[1: -2]
+        curr_constraint = [node.replace("'","") for node in line.split(", ")]
+        constraints.append(curr_constraint)
+
+    output = open(output_file)
+    assignments = []
+    for line in output:
+        line = line[1: -2]
+        curr_assignment = [node.replace("'","") for node in line.split(", ")]
+        assignments.append(curr_assignment)
+
+    if len(assignments) != num_buses:
+        return -1, "Must assign students to exactly {} buses, found {} buses".format(num_buses, len(assignments))
+
+    # make sure no bus is empty or above capacity
+    for i in range(len(assignments)):
+        if len(assignments[i]) > size_bus:
+            return -1, "Bus {} is above capacity".format(i)
+        if len(assignments[i]) <= 0:
+            return -1, "Bus {} is empty".format(i)
+
+    # make sure each student is in exactly one bus
+    bus_of = np.full(len(labels), -1, dtype=np.int64)
+    for i in range(len(assignments)):
+        if not all([student in index for student in assignments[i]]):
+            return -1, "Bus {} references a non-existant student: {}".format(i, assignments[i])
+
+        for student in assignments[i]:
+            if bus_of[index[student]] != -1:
+                return -1, "{0} appears more than once in the bus assignments".format(student)
+            bus_of[index[student]] = i
+
+    # make sure each student is accounted for
+    if (bus_of == -1).any():
+        return -1, "Not all students have been assigned a bus"
+
+    total_edges = len(sources)
+    # Drop the members of rowdy groups which were not broken up
+    members = np.array([index[student] for group in constraints for student in group], dtype=np.int64)
+    group_sizes = np.array([len(group) for group in constraints], dtype=np.int64)
+    removed = np.zeros(len(labels), dtype=bool)
+    if len(members):
+        starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+        member_buses = bus_of[members]
+        unbroken = np.minimum.reduceat(member_buses, starts) == np.maximum.reduceat(member_buses, starts)
+        removed[members[np.repeat(unbroken, group_sizes)]] = True
+
+    # score output
+    kept = ~removed[sources] & ~removed[targets]
+    score = int(np.count_nonzero(kept & (bus_of[sources] == bus_of[targets])))
+    score = score / total_edges
+
+    return score, "Valid output submitted with score: {}".format(score)
+
+def score_instance(size, input_name, inputs_root, outputs_root):
+    input_folder = inputs_root + "/" + size + "/" + input_name
+    score, msg = score_output_fast(input_folder, outputs_root + "/" + size + "/" + input_name + ".out")
+    return size, input_name, score, msg
+
+def score_outputs(inputs_root, outputs_root, workers=None):
+    '''
+        Scores every <outputs_root>/<category>/<name>.out against
+        <inputs_root>/<category>/<name> across a process pool
+
+        Outputs:
+            a dictionary mapping (category, name) to (score, msg)
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+
+    instances = []
+    for size in sorted(os.listdir(outputs_root)):
+        if not os.path.isdir(outputs_root + "/" + size):
+            continue
+        for output_name in sorted(os.listdir(outputs_root + "/" + size)):
+            input_name = output_name[:-len(".out")]
+            input_folder = inputs_root + "/" + size + "/" + input_name
+            if (output_name.endswith(".out") and os.path.isfile(input_folder + "/graph.gml")
+                    and os.path.isfile(input_folder + "/parameters.txt")):
+                instances.append((size, input_name))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(score_instance, size, input_name, inputs_root, outputs_root)
+                   for size, input_name in instances]
+        for future in futures:
+            size, input_name, score, msg = future.result()
+            results[(size, input_name)] = (score, msg)
+    return results
+
+def print_summary(results):
+    '''
+        Prints one row per category: outputs scored, valid outputs and score statistics
+    '''
+    print("{:<10}{:>8}{:>8}{:>10}{:>10}{:>10}".format("category", "scored", "valid", "mean", "min", "max"))
+    for size in sorted({size for size, _ in results}):
+        scores = np.array([score for (category, _), (score, _) in results.items() if category == size])
+        valid = scores[scores >= 0]
+        if len(valid):
+            stats = (valid.mean(), valid.min(), valid.max())
+        else:
+            stats = (float("nan"),) * 3
+        print("{:<10}{:>8}{:>8}{:>10.4f}{:>10.4f}{:>10.4f}".format(size, len(scores), len(valid), *stats))
+
 if __name__ == '__main__':
-    score, msg = score_output(sys.argv[1], sys.argv[2])
-    print(msg)
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        import argparse
+
+        parser = argparse.ArgumentParser(description="Score every output against its input")
+        parser.add_argument("inputs_root")
+        parser.add_argument("outputs_root")
+        parser.add_argument("--workers", type=int, default=None)
+        args = parser.parse_args(sys.argv[2:])
+        print_summary(score_outputs(args.inputs_root, args.outputs_root, args.workers))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--reference":
+        score, msg = score_output(sys.argv[2], sys.argv[3])
+        print(msg)
+    else:
+        score, msg = score_output_fast(sys.argv[1], sys.argv[2])
+        print(msg)
\ No newline at end of file
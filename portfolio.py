@@ -0,0 +1,330 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from batch_driver import best_known, constructions, optimizers, select_optimizer
+from instance_cache import content_hash
+from objective import total_friendships, upper_bound
+from solution_store import SolutionStore, default_path
+from solver import load_instance, solve_anytime
+
+####################################################
+# To run:
+#   python3 portfolio.py category/input_name [...] --deadline SECONDS [--strategies ...] [--workers N]
+#
+#   category/input_name - the instances to solve, one after another
+#   --deadline - wall-clock seconds per instance
+#   --strategies - construction:optimizer pairs to race, by default every construction
+#                  with the switch optimizer plus greedy:tabu
+#   --workers - processes per instance, defaults to the number of cores
+#   --grace - fraction of the deadline every strategy runs before it can be cancelled
+#   --verbose - print the iteration count and iterations per second of every tabu search
+#
+# All strategies of an instance run at once and share the score of the best
+# solution known for it, from earlier runs or found by any of them. Every strategy
+# reports the exact score of the assignment it is working on whenever it checks
+# whether to stop, and is first judged once its first starting assignment has been
+# refined and the grace period is over. It is then cancelled when, over the last
+# tenth of the deadline, its rate of improvement would not carry it past the shared
+# score by the deadline, unless it is the last strategy still running. Its worker
+# picks up the next queued strategy, or once none are left, another run of the
+# strategy that has reached the highest score with a new seed. Every strategy stops
+# once the shared score reaches the instance's upper bound. Solutions are recorded
+# in the solution store (see solution_store.py), which keeps the best in the .out file.
+#
+# Examples:
+#   python3 portfolio.py large2/1030 --deadline 120 --strategies greedy:switch label_propagation:tabu
+####################################################
+
+default_strategies = [construction + ":switch" for construction in constructions] + ["greedy:tabu"]
+
+class Race:
+    '''
+        State shared by the workers racing strategies on one instance: the
+        score of the best solution known for it, the best exact score each
+        strategy has reached, how many strategies are running and how many are
+        still queued, and a counter handing out seeds to extra runs.
+    '''
+
+    def __init__(self, score, num_strategies):
+        '''
+            Inputs:
+                score - the exact score of the best solution known, -1 if none
+                num_strategies - the number of strategies queued
+        '''
+        self.score = multiprocessing.Value("q", score)
+        self.best = multiprocessing.Array("q", [-1] * num_strategies)
+        self.live = multiprocessing.Value("i", 0)
+        self.queued = multiprocessing.Value("i", num_strategies)
+        self.seeds = multiprocessing.Value("i", 0)
+
+    def offer(self, score):
+        '''
+            Raises the shared score to `score`
+
+            Outputs:
+                whether `score` beat it
+        '''
+        with self.score.get_lock():
+            if score <= self.score.value:
+                return False
+            self.score.value = score
+            return True
+
+    def observe(self, index, score):
+        with self.best.get_lock():
+            self.best[index] = max(self.best[index], score)
+
+    def leader(self):
+        '''
+            Returns the index of the strategy that has reached the highest score
+        '''
+        with self.best.get_lock():
+            best = self.best[:]
+        return best.index(max(best))
+
+    def next_seed(self):
+        with self.seeds.get_lock():
+            self.seeds.value += 1
+            return self.seeds.value
+
+    def start(self):
+        with self.live.get_lock():
+            self.live.value += 1
+
+    def finish(self):
+        with self.live.get_lock():
+            self.live.value -= 1
+
+    def cancel(self):
+        '''
+            Counts a running strategy out, unless it is the last one running
+
+            Outputs:
+                whether it was counted out
+        '''
+        with self.live.get_lock():
+            if self.live.value <= 1:
+                return False
+            self.live.value -= 1
+            return True
+
+#The race of the current instance, handed to every worker when the pool starts
+race = None
+
+def init_worker(shared):
+    global race
+    race = shared
+
+class StrategyMonitor:
+    '''
+        Decides when a run of a strategy should give up, from the exact scores
+        it is given as its should_stop callback (see solver.solve_anytime).
+
+        The run stops once the shared score reaches the upper bound. It is
+        cancelled when it trails the shared score and its progress over the
+        last `window` seconds, kept up until the deadline, would not beat it;
+        progress is only judged after `grace` seconds, once the first
+        starting assignment has been refined (see `refined`), and from scores
+        of the assignment being worked on since the last stretch without one,
+        as the optimizers work on the proxy objective. The last running
+        strategy is never cancelled (see Race.cancel).
+    '''
+
+    def __init__(self, index, bound, deadline, grace, window):
+        '''
+            Inputs:
+                index - the index of the strategy in the race
+                bound - the upper bound on the instance's exact score
+                deadline - the time.time() at which the run ends anyway
+                grace - seconds before progress is judged
+                window - seconds over which the rate of progress is measured
+        '''
+        self.index = index
+        self.bound = bound
+        self.deadline = deadline
+        self.window = window
+        self.judged_from = time.time() + grace
+        self.judging = False
+        self.checkpoint = None
+        self.current = None
+        self.cancelled = False
+        self.score = -1
+
+    def observe(self, score):
+        if score > self.score:
+            self.score = score
+            race.observe(self.index, score)
+
+    def refined(self, score):
+        self.observe(score)
+        self.judging = True
+
+    def __call__(self, score=None):
+        if score is None:
+            # the assignment is on the proxy objective, so its progress cannot be
+            # measured; the window starts over once there is an exact score again
+            self.checkpoint = self.current = None
+        else:
+            self.observe(score)
+            self.current = score if self.current is None else max(self.current, score)
+        incumbent = race.score.value
+        if incumbent >= self.bound:
+            return True
+        now = time.time()
+        if self.current is None or not self.judging or now < self.judged_from:
+            return False
+        if self.checkpoint is None:
+            self.checkpoint = (now, self.current)
+            return False
+        checked_at, checked_score = self.checkpoint
+        if now - checked_at < self.window:
+            return False
+        rate = (self.current - checked_score) / (now - checked_at)
+        self.checkpoint = (now, self.current)
+        if (self.score < incumbent and self.current + rate * (self.deadline - now) <= incumbent
+                and race.cancel()):
+            self.cancelled = True
+            return True
+        return False
+
+def run_strategy(size, input_name, path_to_inputs, path_to_outputs, store_path, strategies, index, end_time,
+                 grace, verbose=False):
+    '''
+        Runs strategies[index] on an instance until end_time or until its
+        monitor cancels it; runs inside a worker. A cancelled worker with no
+        strategy left in the queue runs the leading strategy again with a new
+        seed, for as long as there is time.
+
+        Outputs:
+            a list of (strategy, seed, fraction, seconds, cancelled) per run -
+            seed is None for the strategy's first run, fraction the exact score
+            of the run's best solution over the number of friendships (see
+            objective.py), None if it never built one
+    '''
+    with race.queued.get_lock():
+        race.queued.value -= 1
+    instance = size + "/" + input_name
+    input_folder = path_to_inputs + "/" + instance
+    graph, num_buses, size_bus, constraints, graph_prime = load_instance(input_folder)
+    input_hash = content_hash(input_folder)
+    total = total_friendships(graph_prime)
+    bound = upper_bound(graph_prime, size_bus)
+    store = SolutionStore(store_path)
+    results = []
+    seed = None
+    try:
+        while race.score.value < bound and time.time() < end_time:
+            start = time.time()
+            construction, optimizer = strategies[index].split(":")
+            budget = end_time - start
+            monitor = StrategyMonitor(index, bound, end_time, grace * budget, 0.1 * budget)
+            config = {"construction": construction, "optimizer": optimizer, "deadline": budget, "seed": seed}
+            best = [None]
+
+            def on_improvement(solution, score):
+                best[0] = score
+                monitor.observe(score)
+                if race.offer(score):
+                    store.record(instance, input_hash, score, total, "portfolio", config, time.time() - start,
+                                 solution, path_to_outputs + "/" + instance + ".out")
+
+            race.start()
+            try:
+                solve_anytime(graph, num_buses, size_bus, constraints, end_time, None, graph_prime,
+                              select_optimizer(optimizer, verbose), construction, checkpoint_interval=1.0,
+                              on_improvement=on_improvement, should_stop=monitor, on_refined=monitor.refined,
+                              seed=seed)
+            finally:
+                if not monitor.cancelled:
+                    race.finish()
+            results.append((strategies[index], seed, None if best[0] is None else best[0] / max(total, 1),
+                            time.time() - start, monitor.cancelled))
+            if not monitor.cancelled or race.queued.value > 0:
+                break
+            index = race.leader()
+            seed = race.next_seed()
+    finally:
+        store.close()
+    if not results:
+        results.append((strategies[index], seed, None, 0.0, False))
+    return results
+
+def run_portfolio(size, input_name, path_to_inputs, path_to_outputs, deadline, strategies=None, workers=None,
+                  store_path=None, grace=0.2, verbose=False):
+    '''
+        Races a set of strategies on one instance in parallel processes
+
+        Inputs:
+            size, input_name - the instance, path_to_inputs/size/input_name
+            path_to_inputs, path_to_outputs - as for batch_driver.run_batch
+            deadline - wall-clock seconds for the instance
+            strategies - a list of "construction:optimizer" names, default_strategies by default
+            workers - the number of worker processes, defaults to the number of cores
+            store_path - the solution store, solutions.sqlite in path_to_outputs by default
+            grace - fraction of the deadline every strategy runs before it can be cancelled
+            verbose - print the throughput of the tabu optimizer
+
+        Outputs:
+            a list of (strategy, seed, fraction, seconds, cancelled) per run, see
+            run_strategy, in the order the workers finished
+    '''
+    start = time.time()
+    strategies = strategies or default_strategies
+    for strategy in strategies:
+        construction, optimizer = strategy.split(":")
+        if construction not in constructions or optimizer not in optimizers:
+            raise ValueError("Unknown strategy: " + strategy)
+    os.makedirs(path_to_outputs + "/" + size, exist_ok=True)
+    store_path = store_path or default_path(path_to_outputs)
+    # strategies race against the best solution already known for the instance
+    input_folder = path_to_inputs + "/" + size + "/" + input_name
+    graph, num_buses, size_bus, constraints, graph_prime = load_instance(input_folder)
+    store = SolutionStore(store_path)
+    try:
+        best = best_known(store, size + "/" + input_name, content_hash(input_folder), total_friendships(graph_prime),
+                          input_folder, path_to_outputs + "/" + size + "/" + input_name + ".out", graph, constraints,
+                          graph_prime)
+    finally:
+        store.close()
+
+    shared = Race(-1 if best is None else best[0], len(strategies))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(shared,)) as pool:
+        futures = [pool.submit(run_strategy, size, input_name, path_to_inputs, path_to_outputs, store_path,
+                               strategies, index, start + deadline, grace, verbose)
+                   for index in range(len(strategies))]
+        for future in as_completed(futures):
+            try:
+                results.extend(future.result())
+            except Exception as error:
+                print("{}/{}: strategy failed: {!r}".format(size, input_name, error))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Race several strategies on each instance")
+    parser.add_argument("instances", nargs="+", metavar="category/input_name")
+    parser.add_argument("--deadline", type=float, required=True, metavar="SECONDS")
+    parser.add_argument("--strategies", nargs="+", default=None, metavar="CONSTRUCTION:OPTIMIZER")
+    parser.add_argument("--inputs", default="./all_inputs")
+    parser.add_argument("--outputs", default="./outputs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--store", default=None, metavar="PATH")
+    parser.add_argument("--grace", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="print the throughput of the tabu optimizer")
+    args = parser.parse_args()
+    for instance in args.instances:
+        size, input_name = instance.split("/")
+        results = run_portfolio(size, input_name, args.inputs, args.outputs, args.deadline, args.strategies,
+                                args.workers, args.store, args.grace, args.verbose)
+        for strategy, seed, fraction, seconds, cancelled in results:
+            name = strategy if seed is None else "{} (seed {})".format(strategy, seed)
+            if fraction is None:
+                outcome = "cancelled before building a solution" if cancelled else "built no solution"
+            else:
+                outcome = ("cancelled at {:.4f}" if cancelled else "scored {:.4f}").format(fraction)
+            print("{}: {} {} in {:.2f}s".format(instance, name, outcome, seconds))
+
+if __name__ == '__main__':
+    main()
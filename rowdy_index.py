@@ -0,0 +1,121 @@
+import numpy as np
+
+class RowdyIndex:
+    '''
+        Inverted index over the rowdy groups.
+
+        Groups are stored CSR-style like CompactGraph: the members of group g
+        are `members[group_offsets[g]:group_offsets[g + 1]]` (without repeats)
+        and the groups of student s are
+        `student_groups[student_offsets[s]:student_offsets[s + 1]]`.
+    '''
+
+    def __init__(self, num_students, rowdy_groups):
+        '''
+            Inputs:
+                num_students - the number of students
+                rowdy_groups - a list of lists of student ids
+        '''
+        groups = [np.unique(np.asarray(group, dtype=np.int64)) for group in rowdy_groups]
+        self.group_sizes = np.array([len(group) for group in groups], dtype=np.int64)
+        self.group_offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum(self.group_sizes, out=self.group_offsets[1:])
+        self.members = np.concatenate(groups) if groups else np.zeros(0, dtype=np.int64)
+        self.group_ids = np.repeat(np.arange(len(groups)), self.group_sizes)
+
+        order = np.argsort(self.members, kind="stable")
+        self.student_groups = self.group_ids[order]
+        self.student_offsets = np.zeros(num_students + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.members, minlength=num_students), out=self.student_offsets[1:])
+
+    @property
+    def num_groups(self):
+        return len(self.group_sizes)
+
+    def groups_of(self, student):
+        return self.student_groups[self.student_offsets[student]:self.student_offsets[student + 1]]
+
+    def members_of(self, group):
+        return self.members[self.group_offsets[group]:self.group_offsets[group + 1]]
+
+    def group_bits(self):
+        '''
+            Returns the groups of every student as a packed bitmask, one row of
+            ceil(num_groups / 8) bytes per student
+        '''
+        num_students = len(self.student_offsets) - 1
+        bits = np.zeros((num_students, (self.num_groups + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(bits, (self.members, self.group_ids >> 3),
+                         (128 >> (self.group_ids & 7)).astype(np.uint8))
+        return bits
+
+    def share_group(self, sources, targets, chunk_size=1 << 14):
+        '''
+            Returns a boolean array telling for every pair (sources[i], targets[i])
+            whether the two students are in a common rowdy group, by intersecting
+            their group bitmasks `chunk_size` pairs at a time, so no group's pairs
+            are ever enumerated and temporaries stay small
+        '''
+        bits = self.group_bits()
+        shared = np.zeros(len(sources), dtype=bool)
+        if bits.shape[1] == 0:
+            return shared
+        for start in range(0, len(sources), chunk_size):
+            end = start + chunk_size
+            shared[start:end] = (bits[sources[start:end]] & bits[targets[start:end]]).any(axis=1)
+        return shared
+
+class RowdyTracker:
+    '''
+        Per-group, per-bus member counts for one assignment, kept up to date
+        under single-student moves.
+
+            counts[g, b] - the number of members of group g on bus b
+            complete[g]  - whether every member of g is on one bus, which is
+                           what makes output_scorer drop all of g's members
+
+        Whether a move completes or breaks a group is read from the moving
+        student's groups only, so checks and updates are O(groups-per-student).
+    '''
+
+    def __init__(self, index, bus_of, num_buses):
+        '''
+            Inputs:
+                index - the RowdyIndex of the instance
+                bus_of - the bus of every student, all of them seated
+                num_buses - the number of buses
+        '''
+        self.index = index
+        self.counts = np.zeros((index.num_groups, num_buses), dtype=np.int32)
+        np.add.at(self.counts, (index.group_ids, bus_of[index.members]), 1)
+        self.complete = self.counts.max(axis=1, initial=0) == index.group_sizes
+        self.num_complete = int(np.count_nonzero(self.complete))
+
+    def completed_by(self, student, bus_num):
+        '''
+            Returns the groups that moving `student` onto bus `bus_num` (another
+            bus than its own) would leave complete
+        '''
+        groups = self.index.groups_of(student)
+        return groups[self.counts[groups, bus_num] + 1 == self.index.group_sizes[groups]]
+
+    def broken_by(self, student):
+        '''
+            Returns the complete groups that moving `student` off its bus would break up
+        '''
+        groups = self.index.groups_of(student)
+        return groups[self.complete[groups]]
+
+    def move(self, student, old_bus, bus_num):
+        '''
+            Records that `student` moved from bus `old_bus` to bus `bus_num`
+        '''
+        groups = self.index.groups_of(student)
+        if len(groups) == 0 or old_bus == bus_num:
+            return
+        self.counts[groups, old_bus] -= 1
+        self.counts[groups, bus_num] += 1
+        # only a bus holding the student can hold all of one of its groups
+        now_complete = self.counts[groups, bus_num] == self.index.group_sizes[groups]
+        self.num_complete += int(np.count_nonzero(now_complete)) - int(np.count_nonzero(self.complete[groups]))
+        self.complete[groups] = now_complete
@@ -0,0 +1,187 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from batch_driver import all_categories, best_known, constructions, list_instances, optimizers
+from instance_cache import content_hash
+from objective import total_friendships, upper_bound
+from solution_store import SolutionStore, default_path
+from solver import load_instance, solve_anytime
+
+####################################################
+# To run:
+#   python3 scheduler.py [category ...] --budget SECONDS [--workers N] [--quick SECONDS]
+#
+#   category - input size categories to solve, all of them when omitted
+#   --budget - total wall-clock seconds for the whole run
+#   --workers - size of the process pool, defaults to the number of cores
+#   --quick - seconds of the first pass every instance gets
+#   --optimizer, --construction, --store - as for batch_driver.py
+#
+# Every instance first gets a quick anytime pass. The rest of the budget is then
+# shared out in proportion to each instance's headroom, the gap between its
+# score and an upper bound on it (see objective.upper_bound), and spent on a
+# second, longer anytime run. Every run continues from the best solution known
+# for the instance, when there is one, and solutions go through the solution
+# store (see solution_store.py), so a .out file is only ever replaced by a
+# better one.
+#
+# Examples:
+#   python3 scheduler.py --budget 28800 --workers 32
+####################################################
+
+def schedule_instance(size, input_name, path_to_inputs, path_to_outputs, store_path, seconds, end_time,
+                      optimizer="switch", construction="greedy"):
+    '''
+        Runs solve_anytime on one instance for `seconds` (never past end_time),
+        continuing from the best solution known for it when there is one and
+        keeping only solutions that beat it; runs inside a worker
+
+        Outputs:
+            (size, input_name, score, bound, total, seconds) - score is the
+            exact score of the best solution known for the instance (None when
+            there is none), bound its upper bound and total the number of
+            friendships, all in the units of objective.exact_score
+    '''
+    start = time.time()
+    instance = size + "/" + input_name
+    input_folder = path_to_inputs + "/" + instance
+    output_path = path_to_outputs + "/" + instance + ".out"
+    graph, num_buses, size_bus, constraints, graph_prime = load_instance(input_folder)
+    input_hash = content_hash(input_folder)
+    total = total_friendships(graph_prime)
+    config = {"optimizer": optimizer, "construction": construction, "seconds": seconds}
+
+    store = SolutionStore(store_path)
+    try:
+        best = best_known(store, instance, input_hash, total, input_folder, output_path, graph, constraints,
+                          graph_prime)
+        solve_anytime(graph, num_buses, size_bus, constraints, min(start + seconds, end_time), None, graph_prime,
+                      optimizers[optimizer], construction, min_score=None if best is None else best[0],
+                      warm_start=None if best is None else best[1],
+                      on_improvement=lambda solution, score: store.record(instance, input_hash, score, total,
+                                                                          "scheduler", config, time.time() - start,
+                                                                          solution, output_path))
+        score = store.best_score(input_hash)
+    finally:
+        store.close()
+    return size, input_name, score, upper_bound(graph_prime, size_bus), total, time.time() - start
+
+def headroom(result):
+    '''
+        Returns how much of an instance's graded score (a fraction of its
+        friendships) is still possibly missing
+    '''
+    score, bound, total = result
+    if score is None or total == 0:
+        return 1.0 if score is None else 0.0
+    return max(0.0, (bound - score) / total)
+
+def allocate(headrooms, cpu_seconds, min_seconds):
+    '''
+        Shares cpu_seconds among instances in proportion to their headroom,
+        leaving out instances whose share would be below min_seconds and
+        handing their time to the others
+
+        Inputs:
+            headrooms - a dictionary mapping instances to their headroom
+            cpu_seconds - the time to share
+            min_seconds - the smallest share worth a run
+
+        Outputs:
+            a dictionary mapping the chosen instances to their seconds
+    '''
+    candidates = {instance: room for instance, room in headrooms.items() if room > 0}
+    while candidates:
+        total = sum(candidates.values())
+        shares = {instance: cpu_seconds * room / total for instance, room in candidates.items()}
+        too_small = [instance for instance, share in shares.items() if share < min_seconds]
+        if not too_small:
+            return shares
+        # drop the single smallest share and retry, so time is not spread too thin
+        del candidates[min(too_small, key=shares.get)]
+    return {}
+
+def run_schedule(categories, path_to_inputs, path_to_outputs, budget, workers=None, quick=None,
+                 optimizer="switch", construction="greedy", store_path=None):
+    '''
+        Solves every instance of the given categories within a total wall-clock
+        budget: a quick first pass over all of them, then the remaining time
+        reallocated by headroom
+
+        Inputs:
+            categories - a list of size category folder names under path_to_inputs
+            path_to_inputs - the folder containing the size category folders
+            path_to_outputs - the folder the .out files are written to
+            budget - total wall-clock seconds for the run
+            workers - the number of worker processes, defaults to the number of cores
+            quick - seconds per instance in the first pass, by default a quarter of
+                    the budget spread evenly over the instances
+            optimizer, construction, store_path - as for batch_driver.run_batch
+
+        Outputs:
+            a dictionary mapping (category, input_name) to (score, bound, total)
+    '''
+    start = time.time()
+    end_time = start + budget
+    workers = workers or os.cpu_count() or 1
+    for size in categories:
+        os.makedirs(path_to_outputs + "/" + size, exist_ok=True)
+    instances = list_instances(categories, path_to_inputs)
+    if not instances:
+        return {}
+    store_path = store_path or default_path(path_to_outputs)
+    # make sure the schema exists before the workers race to create it
+    SolutionStore(store_path).close()
+    if quick is None:
+        quick = max(1.0, 0.25 * budget * workers / len(instances))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        #Pass 1: every instance gets the same short run
+        futures = [pool.submit(schedule_instance, size, input_name, path_to_inputs, path_to_outputs, store_path,
+                               quick, end_time, optimizer, construction)
+                   for size, input_name in instances]
+        collect(futures, results, "Quick pass", start)
+
+        #Pass 2: the remaining time goes to the instances with the most headroom
+        cpu_seconds = max(0.0, end_time - time.time()) * workers
+        shares = allocate({instance: headroom(result) for instance, result in results.items()}, cpu_seconds,
+                          min_seconds=2 * quick)
+        # longest runs first, so the pool is not left waiting on one at the end
+        futures = [pool.submit(schedule_instance, size, input_name, path_to_inputs, path_to_outputs, store_path,
+                               seconds, end_time, optimizer, construction)
+                   for (size, input_name), seconds in sorted(shares.items(), key=lambda item: -item[1])]
+        collect(futures, results, "Reallocated", start)
+    return results
+
+def collect(futures, results, phase, start):
+    for done, future in enumerate(as_completed(futures), 1):
+        try:
+            size, input_name, score, bound, total, seconds = future.result()
+        except Exception as error:
+            print("[{} {}/{}] Failed: {!r}".format(phase, done, len(futures), error))
+            continue
+        results[(size, input_name)] = (score, bound, total)
+        print("[{} {}/{}] {}/{} scored {:.4f} (bound {:.4f}) in {:.2f}s, {:.0f}s elapsed".format(
+            phase, done, len(futures), size, input_name, (score or 0) / max(total, 1), bound / max(total, 1),
+            seconds, time.time() - start))
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve input folders within a total time budget")
+    parser.add_argument("categories", nargs="*", default=all_categories)
+    parser.add_argument("--budget", type=float, required=True, metavar="SECONDS")
+    parser.add_argument("--inputs", default="./all_inputs")
+    parser.add_argument("--outputs", default="./outputs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--quick", type=float, default=None, metavar="SECONDS",
+                        help="seconds per instance in the first pass")
+    parser.add_argument("--optimizer", choices=sorted(optimizers), default="switch")
+    parser.add_argument("--construction", choices=constructions, default="greedy")
+    parser.add_argument("--store", default=None, metavar="PATH")
+    args = parser.parse_args()
+    run_schedule(args.categories, args.inputs, args.outputs, args.budget, args.workers, args.quick,
+                 args.optimizer, args.construction, args.store)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from instance_cache import content_hash
+from solver import write_output
+
+####################################################
+# To run:
+#   python3 solution_store.py [--store PATH] [--outputs DIR] [--export [category ...]]
+#
+#   --store - the database, outputs/solutions.sqlite by default
+#   --export - rewrite the .out file of every instance of the given categories (all of
+#              them when none are given) from its best stored solution
+#
+# Without --export, prints every instance's best score and how many solutions were
+# recorded for it.
+#
+# Examples:
+#   python3 solution_store.py --export large2 large3
+####################################################
+
+schema = '''
+    CREATE TABLE IF NOT EXISTS solutions (
+        id INTEGER PRIMARY KEY,
+        instance TEXT NOT NULL,
+        input_hash TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        algorithm TEXT NOT NULL,
+        config TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        recorded REAL NOT NULL,
+        solution TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS solutions_by_score ON solutions (input_hash, score DESC, id);
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        instance TEXT NOT NULL,
+        input_hash TEXT NOT NULL,
+        algorithm TEXT NOT NULL,
+        config TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        recorded REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS runs_by_config ON runs (input_hash, algorithm, config);
+'''
+
+def default_path(path_to_outputs):
+    return path_to_outputs + "/solutions.sqlite"
+
+class SolutionStore:
+    '''
+        SQLite record of every solution found, per input folder and content
+        hash (instance_cache.content_hash), with its exact score (see
+        objective.py), the algorithm and config that produced it and the
+        seconds it took.
+
+        The best solution of an input is the one with the highest score,
+        the earliest on ties. Runs that finish are recorded too, whether or
+        not they found a solution worth keeping, so a batch can tell which
+        inputs it has already been through. Several processes may write to
+        the same store; each should open its own SolutionStore.
+    '''
+
+    def __init__(self, path, timeout=60.0):
+        '''
+            Inputs:
+                path - the database file, created when missing
+                timeout - seconds to wait for another process's write to finish
+        '''
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(schema)
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, instance, input_hash, score, total, algorithm, config, seconds, solution, export_path=None):
+        '''
+            Records one solution
+
+            Inputs:
+                instance - the input folder, e.g. "large2/1030"
+                input_hash - the content hash of the input folder
+                score, total - the exact score of the solution and the number of friendships
+                algorithm - a short name of what produced the solution, e.g. "anytime"
+                config - a JSON-serializable dictionary of the settings used
+                seconds - the seconds spent on the instance so far
+                solution - a list of buses of student labels
+                export_path - optional .out file to write the solution to when it
+                              is the new best of its input
+
+            Outputs:
+                whether the solution is the new best of its input
+        '''
+        # the whole check-insert-export runs under the write lock, so two
+        # processes improving the same input cannot export out of order
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            best = self.best_score(input_hash)
+            self.connection.execute(
+                "INSERT INTO solutions (instance, input_hash, score, total, algorithm, config, seconds, recorded, "
+                "solution) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (instance, input_hash, int(score), int(total), algorithm, json.dumps(config, sort_keys=True),
+                 seconds, time.time(), json.dumps(solution)))
+            improved = best is None or score > best
+            if improved and export_path is not None:
+                write_output(export_path, solution)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return improved
+
+    def record_run(self, instance, input_hash, algorithm, config, seconds):
+        '''
+            Records that a run finished on an input, with the same instance,
+            input_hash, algorithm and config as its solutions
+        '''
+        self.connection.execute(
+            "INSERT INTO runs (instance, input_hash, algorithm, config, seconds, recorded) VALUES (?, ?, ?, ?, ?, ?)",
+            (instance, input_hash, algorithm, json.dumps(config, sort_keys=True), seconds, time.time()))
+
+    def has_run(self, input_hash, algorithm, config):
+        '''
+            Outputs:
+                whether a run with this algorithm and config has finished on the input
+        '''
+        row = self.connection.execute(
+            "SELECT 1 FROM runs WHERE input_hash = ? AND algorithm = ? AND config = ? LIMIT 1",
+            (input_hash, algorithm, json.dumps(config, sort_keys=True))).fetchone()
+        return row is not None
+
+    def best_score(self, input_hash):
+        row = self.connection.execute("SELECT MAX(score) FROM solutions WHERE input_hash = ?",
+                                      (input_hash,)).fetchone()
+        return row[0]
+
+    def best(self, input_hash):
+        '''
+            Outputs:
+                (score, solution) of the best solution recorded for the input,
+                or None when there is none
+        '''
+        row = self.connection.execute(
+            "SELECT score, solution FROM solutions WHERE input_hash = ? ORDER BY score DESC, id LIMIT 1",
+            (input_hash,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def history(self, input_hash):
+        '''
+            Outputs:
+                (score, total, algorithm, config, seconds, recorded) of every
+                solution recorded for the input, oldest first
+        '''
+        rows = self.connection.execute(
+            "SELECT score, total, algorithm, config, seconds, recorded FROM solutions WHERE input_hash = ? "
+            "ORDER BY id", (input_hash,)).fetchall()
+        return [(score, total, algorithm, json.loads(config), seconds, recorded)
+                for score, total, algorithm, config, seconds, recorded in rows]
+
+    def summary(self):
+        '''
+            Outputs:
+                (instance, best score, total, number of solutions) per instance
+                name and content hash, sorted by instance
+        '''
+        return self.connection.execute(
+            "SELECT instance, MAX(score), total, COUNT(*) FROM solutions GROUP BY instance, input_hash "
+            "ORDER BY instance").fetchall()
+
+def export_best(store, categories, path_to_inputs, path_to_outputs):
+    '''
+        Writes the best stored solution of every instance of the given
+        categories, for the current contents of its input folder, to its .out
+        file
+
+        Outputs:
+            the number of .out files written
+    '''
+    from batch_driver import list_instances
+    written = 0
+    for size, input_name in list_instances(categories, path_to_inputs):
+        best = store.best(content_hash(path_to_inputs + "/" + size + "/" + input_name))
+        if best is None:
+            continue
+        os.makedirs(path_to_outputs + "/" + size, exist_ok=True)
+        write_output(path_to_outputs + "/" + size + "/" + input_name + ".out", best[1])
+        written += 1
+    return written
+
+def main():
+    from batch_driver import all_categories
+    parser = argparse.ArgumentParser(description="Inspect the solution store or export its best solutions")
+    parser.add_argument("--store", default=None, help="defaults to solutions.sqlite in the outputs folder")
+    parser.add_argument("--inputs", default="./all_inputs")
+    parser.add_argument("--outputs", default="./outputs")
+    parser.add_argument("--export", nargs="*", default=None, metavar="CATEGORY")
+    args = parser.parse_args()
+    store = SolutionStore(args.store or default_path(args.outputs))
+    if args.export is not None:
+        written = export_best(store, args.export or all_categories, args.inputs, args.outputs)
+        print("Exported {} solutions".format(written))
+    else:
+        for instance, score, total, count in store.summary():
+            print("{}: {:.4f} best of {} solutions".format(instance, score / max(total, 1), count))
+    store.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,21 @@
-import networkx as nx
+import functools
+import numpy as np
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from annealing import simulated_annealing
+from assignment import Assignment
+from compact_graph import CompactGraph
+from fm_refine import fill_empty_buses, fm_refine, swap_refine
+from gml_reader import read_gml_edges
+from incumbent import Incumbent
+import instance_cache
+from label_propagation import label_propagation_partition
+from multilevel import multilevel_partition
+from objective import ExactScorer, exact_refine, exact_score
+from rowdy_index import RowdyIndex
+from tabu import tabu_search
+from incremental_scorer import IncrementalScorer
 
 ###########################################
 # Change this variable to the path to
@@ -24,13 +40,13 @@ def parse_input(folder_name):
 
         Outputs:
             (graph, num_buses, size_bus, constraints)
-            graph - the graph as a NetworkX object
+            graph - the graph as a CompactGraph, self-loops recorded in graph.self_loops
             num_buses - an integer representing the number of buses you can allocate to
             size_buses - an integer representing the number of students that can fit on a bus
             constraints - a list where each element is a list vertices which represents a single rowdy group
     '''
-    graph = nx.read_gml(folder_name + "/graph.gml")
-    graph.remove_edges_from(graph.selfloop_edges())
+    labels, sources, targets = read_gml_edges(folder_name + "/graph.gml", keep_self_loops=True)
+    graph = CompactGraph.from_edges(labels, sources, targets)
     parameters = open(folder_name + "/parameters.txt")
     num_buses = int(parameters.readline())
     size_bus = int(parameters.readline())
@@ -43,131 +59,330 @@ def parse_input(folder_name):
 
     return graph, num_buses, size_bus, constraints
 
-def solve(graph, num_buses, size_bus, constraints):
+def load_instance(folder_name):
+    '''
+        Returns an input together with its G', reading both from the instance
+        cache when the folder's graph.gml and parameters.txt are unchanged
+
+        Outputs:
+            (graph, num_buses, size_bus, constraints, graph_prime)
+    '''
+    cached = instance_cache.load(folder_name)
+    if cached is not None:
+        return cached
+    graph, num_buses, size_bus, constraints = parse_input(folder_name)
+    graph_prime = build_graph_prime(graph, constraints)
+    instance_cache.store(folder_name, graph, num_buses, size_bus, constraints, graph_prime)
+    return graph, num_buses, size_bus, constraints, graph_prime
+
+def solve(graph, num_buses, size_bus, constraints, graph_prime=None, parallel=False, optimizer=None,
+          construction="greedy"):
     #TODO: Write this method as you like. We'd recommend changing the arguments here as well
     #Inputs: graph, num_buses, size_bus, constraints
+    #graph_prime may be passed in when it was already built, e.g. by load_instance
+    #parallel runs the three heuristic pipelines in their own processes over a shared G'
+    #optimizer refines each heuristic's result, switch_optimizer unless e.g. tabu_optimizer is given
+    #construction is "greedy" for the three heuristic orderings, or "multilevel" / "spectral" /
+    #"label_propagation" for a single heuristic_multilevel / heuristic_spectral /
+    #heuristic_label_propagation seed
+
+    #Preprocessing of G' where G' is G, but without edges found in constraints
+    if graph_prime is None:
+        graph_prime = build_graph_prime(graph, constraints)
+
+    #Process Heuristics on G and G', then do Optimization (AKA swapping students!)
+    pipelines = construction_pipelines(graph, size_bus, constraints, construction)
+    if parallel:
+        results = run_pipelines_in_parallel(graph_prime, num_buses, size_bus, constraints, pipelines, optimizer)
+    else:
+        results = [run_pipeline(graph_prime, num_buses, size_bus, constraints, heuristic, order, optimizer)
+                   for heuristic, order in pipelines]
 
+    #Compare Results
+    best_result, best_buses = max(results, key=lambda result: result[0])
+
+    #Create .out output_file
+
+    return [graph.labels_of(bus) for bus in best_buses.buses()]
+
+#The (heuristic, order) pairs run for a construction, see solve. A seed, when given,
+#replaces the fixed default seed of the randomized constructions; the greedy
+#orderings are deterministic and ignore it
+def construction_pipelines(graph, size_bus, constraints, construction="greedy", seed=None):
+    rowdy_number, semi_popular_students, most_popular_students = heuristic_orders(graph, size_bus, constraints)
+    seeded = {"multilevel": heuristic_multilevel, "spectral": heuristic_spectral,
+              "label_propagation": heuristic_label_propagation}
+    if construction in seeded:
+        heuristic = seeded[construction]
+        if seed is not None:
+            heuristic = functools.partial(heuristic, seed=seed)
+        return [(heuristic, most_popular_students)]
+    return [(heuristic_one, rowdy_number),
+            (heuristic_two, semi_popular_students),
+            (heuristic_three, most_popular_students)]
+
+#Priority orders used by the three construction heuristics, keyed by student id
+def heuristic_orders(graph, size_bus, constraints):
     #Heuristic Order #1
     rowdy_number = {}
     for rowdy_list in constraints:
-        for student in rowdy_list:
+        for student in graph.ids(rowdy_list):
             if student in rowdy_number:
                 rowdy_number[student] += 1
             else:
                 rowdy_number[student] = 1
-    for student in graph.nodes():
+    for student in range(graph.num_nodes):
         if student not in rowdy_number:
             rowdy_number[student] = 0
 
     # print(len(rowdy_number))
     #Heuristic Order #2
+    degrees = graph.degrees().tolist()
     semi_popular_students = {}
-    for student in graph.nodes():
-        if graph.degree[student] <= size_bus:
-            semi_popular_students[student] = graph.degree()[student]
-    for student in graph.nodes():
+    for student in range(graph.num_nodes):
+        if degrees[student] <= size_bus:
+            semi_popular_students[student] = degrees[student]
+    for student in range(graph.num_nodes):
         if student not in semi_popular_students:
             semi_popular_students[student] = 0
 
     #Heuristic Order # 3
     most_popular_students = {}
-    for student in graph.nodes():
-        most_popular_students[student] = graph.degree()[student]
+    for student in range(graph.num_nodes):
+        most_popular_students[student] = degrees[student]
 
     # print(len(most_popular_students))
 
-    #Preprocessing of G' where G' is G, but without edges found in constraints
-    graph_prime = graph.copy()
-    #for student1 in graph_prime.nodes:
-    #    for student2 in graph_prime.nodes:
-    #        if graph_prime.has_edge(student1, student2):
-    #            graph_prime[student1][student2]['weight'] = 1
-    #            print(graph_prime[student1][student2]['weight'])
-
+    return rowdy_number, semi_popular_students, most_popular_students
 
-    for edge in graph_prime.edges():
-        graph_prime[edge[0]][edge[1]]['weight'] = 1
-
-    for rowdy_list in constraints:
-        for student1 in rowdy_list:
-            for student2 in rowdy_list:
-                if graph_prime.has_edge(student1, student2):
-                    graph_prime[student1][student2]['weight'] = 2
-
-                else:
-                    graph_prime.add_edge(student1, student2)
-                    graph_prime[student1][student2]['weight'] = 2
-
-    #Process Heuristics on G and G'
-    points1, buses1 = heuristic_one(graph_prime, num_buses, size_bus, constraints, rowdy_number)
-    points2, buses2 = heuristic_two(graph_prime, num_buses, size_bus, constraints, semi_popular_students)
-    points3, buses3 = heuristic_three(graph_prime, num_buses, size_bus, constraints, most_popular_students)
-    #points4, buses4 = heuristic_four(graph_prime, num_buses, size_bus, constraints)
-
-    #Do Optimization (AKA swapping students for specific amount of iterations!)
-    points1, buses1 = non_empty_bus_organizer(graph_prime, buses1, rowdy_number)
-    points2, buses2 = non_empty_bus_organizer(graph_prime, buses2, semi_popular_students)
-    points3, buses3 = non_empty_bus_organizer(graph_prime, buses3, most_popular_students)
-    #points4, buses4 = non_empty_bus_organizer(graph_prime, buses4, most_popular_students)
-
-    points1, buses1 = switch_optimizer(graph_prime, buses1, size_bus)
-    points2, buses2 = switch_optimizer(graph_prime, buses2, size_bus)
-    points3, buses3 = switch_optimizer(graph_prime, buses3, size_bus)
-    #points4, buses4 = switch_optimizer(graph_prime, buses4, size_bus)
-
-    #Compare Results
-    best_result = max(points1, points2, points3)
-    # best_result = max(points1, points3)
+def solve_annealing(graph, num_buses, size_bus, constraints, graph_prime=None, time_budget=10.0,
+                    start_temperature=2.0, end_temperature=0.05, seed=None):
+    '''
+        Runs the three heuristic pipelines like `solve`, then spends the rest of
+        `time_budget` seconds annealing the best of them (see annealing.py) on
+        the graded objective. The optimizers of the pipelines are cut short
+        at the end of the budget, so only building the three starting
+        assignments can run past it
 
-    if (best_result == points1):
-        best_buses = buses1
-    elif (best_result == points2):
-        best_buses = buses2
-    elif (best_result == points3):
-        best_buses = buses3
+        Outputs:
+            the best feasible assignment found, as a list of buses of student labels
+    '''
+    start = time.time()
+    deadline = start + time_budget
+    if graph_prime is None:
+        graph_prime = build_graph_prime(graph, constraints)
+    rowdy_index = build_rowdy_index(graph_prime, constraints)
+    results = [improve(graph_prime, construct(graph_prime, num_buses, size_bus, constraints, heuristic, order),
+                       size_bus, rowdy_index, deadline=deadline)
+               for heuristic, order in construction_pipelines(graph, size_bus, constraints)]
+    points, assignment = max(results, key=lambda result: result[0])
+
+    scorer = ExactScorer(graph_prime, assignment, rowdy_index)
+    simulated_annealing(scorer, size_bus, deadline - time.time(), start_temperature, end_temperature, seed=seed)
+    return [graph.labels_of(bus) for bus in assignment.buses()]
+
+def solve_anytime(graph, num_buses, size_bus, constraints, deadline, output_path=None, graph_prime=None,
+                  optimizer=None, construction="greedy", checkpoint_interval=5.0, min_score=None,
+                  warm_start=None, on_improvement=None, should_stop=None, on_refined=None, seed=None):
+    '''
+        Anytime version of `solve`: works until `deadline` and always holds a
+        feasible best-so-far assignment
 
+        The pipelines of the construction run one after another; each offers
+        its starting assignment as soon as it is built and again once refined,
+        with the optimizers cut short at the deadline. Time left after the last
+        pipeline is spent annealing the best assignment on the graded
+        objective. Every improvement is written to output_path atomically, at
+        most once every checkpoint_interval seconds while annealing, so
+        stopping the process at any point leaves the best solution found on disk.
 
+        Inputs:
+            graph, num_buses, size_bus, constraints - the instance, as for `solve`
+            deadline - the time.time() by which to return
+            output_path - optional .out file to checkpoint the best solution to
+            graph_prime, optimizer, construction - as for `solve`
+            checkpoint_interval - minimum seconds between checkpoints while annealing
+            min_score - optional exact score (see objective.py) a solution has to
+                        beat to be kept and written, e.g. that of the current .out
+            warm_start - optional feasible solution (a list of buses of student
+                         labels) to improve instead of running the construction
+            on_improvement - optional callback given every new best solution and
+                             its exact score, called instead of writing output_path
+            should_stop - optional callback checked with the deadline, also
+                          inside the optimizers; the run ends early when it
+                          returns True. It is given the exact score of the
+                          assignment being worked on, or None while that
+                          score is unknown, e.g. inside the proxy optimizers
+            on_refined - optional callback given the exact score of every
+                         starting assignment once `improve` has refined it
+            seed - optional seed for the randomized constructions and the
+                   annealing, so repeated runs explore differently; by default
+                   the constructions use their fixed seed and the annealing a
+                   random one
 
-    #Create .out output_file
+        Outputs:
+            the best feasible assignment found, as a list of buses of student
+            labels, or None if the deadline passed before one was built (or
+            none beat min_score)
+    '''
+    if graph_prime is None:
+        graph_prime = build_graph_prime(graph, constraints)
+    rowdy_index = build_rowdy_index(graph_prime, constraints)
+    if on_improvement is None and output_path is not None:
+        on_improvement = lambda solution, score: write_output(output_path, solution)
+    incumbent = Incumbent(graph, size_bus, on_improvement, min_score)
+
+    if warm_start is not None:
+        starts = [lambda: Assignment.from_buses(graph.num_nodes, [graph.ids(bus) for bus in warm_start])]
+    else:
+        starts = [lambda heuristic=heuristic, order=order:
+                  construct(graph_prime, num_buses, size_bus, constraints, heuristic, order)
+                  for heuristic, order in construction_pipelines(graph, size_bus, constraints, construction, seed)]
+
+    best = None
+    best_points = None
+    for start in starts:
+        if time.time() >= deadline or (should_stop is not None and should_stop(best_points)):
+            break
+        assignment = start()
+        incumbent.offer(exact_score(graph_prime, rowdy_index, assignment.bus_of), assignment)
+        points, assignment = improve(graph_prime, assignment, size_bus, rowdy_index, optimizer, deadline,
+                                     should_stop)
+        incumbent.offer(points, assignment)
+        if on_refined is not None:
+            on_refined(points)
+        if best is None or points > best_points:
+            best, best_points = assignment, points
+
+    remaining = deadline - time.time()
+    if best is not None and incumbent.feasible(best) and remaining > 0:
+        scorer = ExactScorer(graph_prime, best, rowdy_index)
+        simulated_annealing(scorer, size_bus, remaining, seed=seed,
+                            on_best=lambda scorer: incumbent.offer(scorer.score, scorer.assignment),
+                            report_interval=checkpoint_interval, should_stop=stop_check(should_stop, scorer))
+        incumbent.offer(scorer.score, scorer.assignment)
+    return incumbent.solution
+
+def solve_warm_start(graph, num_buses, size_bus, constraints, solution, graph_prime=None, optimizer=None):
+    '''
+        Improves an existing solution, e.g. one read back from a .out file,
+        with the optimizer and exact_refine instead of building a new one
 
-    return best_buses
+        Inputs:
+            graph, num_buses, size_bus, constraints - the instance, as for `solve`
+            solution - a feasible solution, as a list of buses of student labels
+            graph_prime, optimizer - as for `solve`
 
-def switch_optimizer(graph_prime, buses, size_bus):
-    have_not_covered_all_students = True
-    while (have_not_covered_all_students):
-        switched = switcher(graph_prime, buses, size_bus)
-        if (switched != True):
-            have_not_covered_all_students = False
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
-    return overall_score, buses
-
-def switcher(graph_prime, buses, size_bus):
-    for student in graph_prime:
-        original_bus = find_bus(student, buses)
-        original_bus_score = bus_score(graph_prime, original_bus)
-        leave_bus = original_bus.copy()
-        leave_bus.remove(student)
-        leave_bus_score = bus_score(graph_prime, leave_bus)
-        for bus in buses:
-            if len(bus) < size_bus:
-                current_bus = bus.copy()
-                current_bus_score_alone = bus_score(graph_prime, current_bus)
-                current_bus.append(student)
-                current_score = bus_score(graph_prime, current_bus)
-                leaving_total = original_bus_score + current_bus_score_alone
-                entering_total = current_score + leave_bus_score
-                if (current_score + leave_bus_score > original_bus_score + current_bus_score_alone):
-                    original_bus.remove(student)
-                    bus.append(student)
-                    return True
-    return False
-
-def find_bus(student, buses):
-    for bus in buses:
-        if student in bus:
-            return bus
+        Outputs:
+            (score, solution) - the exact score (see objective.py) of the
+            improved solution and the solution itself
+    '''
+    if graph_prime is None:
+        graph_prime = build_graph_prime(graph, constraints)
+    rowdy_index = build_rowdy_index(graph_prime, constraints)
+    assignment = Assignment.from_buses(graph.num_nodes, [graph.ids(bus) for bus in solution])
+    points, assignment = improve(graph_prime, assignment, size_bus, rowdy_index, optimizer)
+    return points, [graph.labels_of(bus) for bus in assignment.buses()]
+
+#One heuristic followed by the optimizations applied to its result
+def run_pipeline(graph_prime, num_buses, size_bus, constraints, heuristic, order, optimizer=None):
+    assignment = construct(graph_prime, num_buses, size_bus, constraints, heuristic, order)
+    return improve(graph_prime, assignment, size_bus, build_rowdy_index(graph_prime, constraints), optimizer)
+
+#Runs a heuristic and makes sure no bus is left empty
+def construct(graph_prime, num_buses, size_bus, constraints, heuristic, order):
+    points, buses = heuristic(graph_prime, num_buses, size_bus, constraints, order)
+    points, buses = non_empty_bus_organizer(graph_prime, buses, order)
+    return buses
+
+#The optimizers work on the weight-1 proxy; exact_refine then climbs on the graded
+#objective (see objective.py), whose value is returned so pipelines are compared on
+#what is graded. Both stop at the optional deadline, or when should_stop returns True;
+#it is given the exact score while exact_refine runs and None before, see solve_anytime
+def improve(graph_prime, assignment, size_bus, rowdy_index, optimizer=None, deadline=None, should_stop=None):
+    if optimizer is None:
+        optimizer = switch_optimizer
+    points, buses = optimizer(graph_prime, assignment, size_bus, deadline, stop_check(should_stop))
+    scorer = ExactScorer(graph_prime, buses, rowdy_index)
+    exact_refine(scorer, size_bus, deadline=deadline, should_stop=stop_check(should_stop, scorer))
+    return scorer.score, buses
+
+#Turns a should_stop callback taking a score (see solve_anytime) into the callback
+#without arguments the optimizers check, passing it the score of an ExactScorer, or
+#None when there is none
+def stop_check(should_stop, scorer=None):
+    if should_stop is None:
+        return None
+    if scorer is None:
+        return lambda: should_stop(None)
+    return lambda: should_stop(scorer.score)
+
+def pipeline_worker(handle, num_buses, size_bus, constraints, heuristic, order, optimizer=None):
+    graph_prime, blocks = CompactGraph.from_shared_memory(handle)
+    try:
+        return run_pipeline(graph_prime, num_buses, size_bus, constraints, heuristic, order, optimizer)
+    finally:
+        del graph_prime
+        for block in blocks:
+            block.close()
+
+#Publishes G' once in shared memory and runs every pipeline in its own process,
+#so the wall-clock time is that of the slowest pipeline instead of their sum
+def run_pipelines_in_parallel(graph_prime, num_buses, size_bus, constraints, pipelines, optimizer=None):
+    blocks, handle = graph_prime.to_shared_memory()
+    try:
+        with ProcessPoolExecutor(max_workers=len(pipelines)) as pool:
+            futures = [pool.submit(pipeline_worker, handle, num_buses, size_bus, constraints, heuristic, order,
+                                   optimizer)
+                       for heuristic, order in pipelines]
+            return [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+#G' keeps every friendship of G with weight 1, except friendships between two
+#students sharing a rowdy group, which get weight 2. G' is an overlay of G: it shares
+#G's labels and CSR arrays and only owns its int8 weights, and the pairs sharing a
+#group are found by intersecting the students' group bitmasks (see rowdy_index.py)
+def build_graph_prime(graph, constraints):
+    rowdy_index = build_rowdy_index(graph, constraints)
+    rows = np.repeat(np.arange(graph.num_nodes), graph.degrees())
+    weights = np.where(rowdy_index.share_group(rows, graph.neighbors), 2, graph.weights).astype(np.int8)
+    return graph.overlay(weights)
+
+#Inverted index over the rowdy groups (student -> groups), see rowdy_index.py
+def build_rowdy_index(graph, constraints):
+    return RowdyIndex(graph.num_nodes, [graph.ids(rowdy_list) for rowdy_list in constraints])
+
+#Refines an assignment with Fiduccia-Mattheyses passes (see fm_refine), which keep
+#buses within size_bus and never leave one empty, then trades students between
+#buses while that helps; swaps keep making progress once the buses are full.
+#Both stop at the optional deadline (a time.time() value) or when should_stop returns True
+def switch_optimizer(graph_prime, assignment, size_bus, deadline=None, should_stop=None):
+    scorer = IncrementalScorer(graph_prime, assignment)
+    fm_refine(scorer, size_bus, deadline=deadline, should_stop=should_stop)
+    while swap_refine(scorer, deadline=deadline, should_stop=should_stop):
+        fm_refine(scorer, size_bus, deadline=deadline, should_stop=should_stop)
+    return scorer.score, assignment
+
+#Refines an assignment with tabu search (see tabu.py), then polishes the result
+#with FM passes; with verbose, the iteration count and throughput of the tabu
+#search are printed so runs on different inputs and machines can be compared
+def tabu_optimizer(graph_prime, assignment, size_bus, deadline=None, should_stop=None, verbose=False):
+    scorer = IncrementalScorer(graph_prime, assignment)
+    fill_empty_buses(scorer)
+    best_score, iterations, iterations_per_second = tabu_search(
+        scorer, size_bus, time_budget=None if deadline is None else max(0.0, deadline - time.time()),
+        should_stop=should_stop)
+    if verbose:
+        print("Tabu search: {} iterations, {:.0f} per second, proxy score {}".format(
+            iterations, iterations_per_second, best_score))
+    fm_refine(scorer, size_bus, deadline=deadline, should_stop=should_stop)
+    return scorer.score, assignment
+
+def find_bus(student, assignment):
+    return assignment.members[assignment.find_bus(student)]
 
 #def individual_bus_scores(graph_prime, buses):
 #    amortized = {}
@@ -177,129 +392,103 @@ def find_bus(student, buses):
 #    return amortized
 
 #Makes sure that a bus will not remain empty after the initial heuristics dictionaries are implemented
-def non_empty_bus_organizer(graph_prime, buses, dictionary):
-    loner = ''
-    blacklist = []
-    for bus1 in buses:
-        if len(bus1) == 0:
-            for bus2 in buses:
-                if bool(dictionary) == False:
-                    break
-                if list(dictionary.keys())[0] in bus2 and list(dictionary.keys())[0] not in blacklist:
-                    loner = list(dictionary.keys())[0]
-                    bus2.remove(list(dictionary.keys())[0])
-                    bus1.append(loner)
-                    blacklist.append(loner)
-                    dictionary.pop(loner)
-                    break
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
+def non_empty_bus_organizer(graph_prime, assignment, dictionary):
+    for bus_num in range(assignment.num_buses):
+        if assignment.size(bus_num) == 0:
+            if bool(dictionary) == False:
+                break
+            loner = next(iter(dictionary))
+            assignment.move(loner, bus_num)
+            dictionary.pop(loner)
 
-    return overall_score, buses
+    return total_score(graph_prime, assignment), assignment
 
 
 def heuristic_one(graph_prime, num_buses, size_bus, constraints, rowdy_number):
     #Sort students into buses
-    buses = [[] for _ in range(num_buses)]
-    best_bus = 0
-    best_score = 0
-    for student in sorted(rowdy_number, key=rowdy_number.get, reverse=True):
-        for bus_num in range(num_buses):
-            if (len(buses[bus_num]) >= size_bus):
-                pass
-            else:
-                current_bus = buses[bus_num].copy()
-                current_bus.append(student)
-                current_score = bus_score(graph_prime, current_bus)
-                if (current_score >= best_score):
-                    best_bus = bus_num
-                    best_score = current_score
-        buses[best_bus].append(student)
-    #Create an overall score based on the bus list created, then returns it.
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
+    order = sorted(rowdy_number, key=rowdy_number.get, reverse=True)
+    assignment = greedy_construct(graph_prime, num_buses, size_bus, order)
 
-    return overall_score, buses
+    #Create an overall score based on the bus list created, then returns it.
+    return total_score(graph_prime, assignment), assignment
 
 def heuristic_two(graph_prime, num_buses, size_bus, constraints, semi_popular_students):
-    buses = [[] for _ in range(num_buses)]
-    best_bus = 0
-    best_score = 0
-    for student in sorted(semi_popular_students, key=semi_popular_students.get, reverse=True):
-        for bus_num in range(num_buses):
-            if (len(buses[bus_num]) >= size_bus):
-                pass
-            else:
-                current_bus = buses[bus_num].copy()
-                current_bus.append(student)
-                current_score = bus_score(graph_prime, current_bus)
-                if (current_score >= best_score):
-                    best_bus = bus_num
-                    best_score = current_score
-        buses[best_bus].append(student)
+    order = sorted(semi_popular_students, key=semi_popular_students.get, reverse=True)
+    assignment = greedy_construct(graph_prime, num_buses, size_bus, order)
 
     #Create an overall score based on the bus list created, then returns it.
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
-    return overall_score, buses
+    return total_score(graph_prime, assignment), assignment
 
 def heuristic_three(graph_prime, num_buses, size_bus, constraints, most_popular_students):
-    buses = [[] for _ in range(num_buses)]
-    best_bus = 0
-    best_score = 0
-    for student in sorted(most_popular_students, key=most_popular_students.get, reverse=True):
-        for bus_num in range(num_buses):
-            if (len(buses[bus_num]) >= size_bus):
-                pass
-            else:
-                current_bus = buses[bus_num].copy()
-                current_bus.append(student)
-                current_score = bus_score(graph_prime, current_bus)
-                if (current_score >= best_score):
-                    best_bus = bus_num
-                    best_score = current_score
-        buses[best_bus].append(student)
+    order = sorted(most_popular_students, key=most_popular_students.get, reverse=True)
+    assignment = greedy_construct(graph_prime, num_buses, size_bus, order)
 
     #Create an overall score based on the bus list created, then returns it.
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
-    return overall_score, buses
+    return total_score(graph_prime, assignment), assignment
+
+#Shared greedy engine behind the heuristics: seats students in the given priority
+#order, each on the non-full bus holding the most of its weight-1 friends (the
+#last such bus on ties). friends[s, b] is kept up to date as students are seated,
+#so the whole construction is O(E + N * B)
+def greedy_construct(graph_prime, num_buses, size_bus, order):
+    assignment = Assignment(graph_prime.num_nodes, num_buses)
+    friends = np.zeros((graph_prime.num_nodes, num_buses), dtype=np.int32)
+    for student in order:
+        gains = np.where(assignment.sizes < size_bus, friends[student], -1)
+        best_bus = num_buses - 1 - int(np.argmax(gains[::-1]))
+        assignment.assign(student, best_bus)
+        neighbors = graph_prime.neighbors_of(student)[graph_prime.weights_of(student) == 1]
+        friends[neighbors, best_bus] += 1
+    return assignment
+
+#Multilevel partition of G' (see multilevel.py); the order is not used
+def heuristic_multilevel(graph_prime, num_buses, size_bus, constraints, order, seed=0):
+    assignment = multilevel_partition(graph_prime, num_buses, size_bus, seed=seed)
+    return total_score(graph_prime, assignment), assignment
+
+#Spectral embedding of G' cut into buses by balanced k-means (see spectral.py); the
+#order is not used. SciPy is only needed for this heuristic, so it is imported here
+def heuristic_spectral(graph_prime, num_buses, size_bus, constraints, order, seed=0):
+    from spectral import spectral_partition
+
+    assignment = spectral_partition(graph_prime, num_buses, size_bus, seed=seed)
+    return total_score(graph_prime, assignment), assignment
+
+#Capacity-constrained label propagation over G' (see label_propagation.py); the
+#order is not used
+def heuristic_label_propagation(graph_prime, num_buses, size_bus, constraints, order, seed=0):
+    assignment = label_propagation_partition(graph_prime, num_buses, size_bus,
+                                             build_rowdy_index(graph_prime, constraints), seed=seed)
+    return total_score(graph_prime, assignment), assignment
 
 def heuristic_four(graph_prime, num_buses, size_bus, constraints):
-    buses = [[] for _ in range(num_buses)]
-    chunk = len(graph_prime.nodes()) // num_buses
-    leftover = len(graph_prime.nodes()) // chunk
-    end = chunk
+    assignment = Assignment(graph_prime.num_nodes, num_buses)
+    chunk = graph_prime.num_nodes // num_buses
     start = 0
-    students = []
-    for student in graph_prime.nodes():
-        students.append(student)
-
-    for bus in buses:
-        for x in range(start, end):
-            bus.append(students[x])
+    for bus_num in range(num_buses):
+        for student in range(start, start + chunk):
+            assignment.assign(student, bus_num)
         start += chunk
-        end += chunk
 
-    print(buses)
+    print(assignment.buses())
 
     #Create an overall score based on the bus list created, then returns it.
-    overall_score = 0
-    for bus in buses:
-        overall_score += bus_score(graph_prime, bus)
+    overall_score = total_score(graph_prime, assignment)
     print(overall_score)
-    return overall_score, buses
+    return overall_score, assignment
 
+#Number of weight-1 edges of G' inside buses, the sum of bus_score over every bus
+def total_score(graph_prime, assignment):
+    sources, targets, weights = graph_prime.edges()
+    bus_of = assignment.bus_of
+    same_bus = (bus_of[sources] == bus_of[targets]) & (bus_of[sources] != -1)
+    return int(np.count_nonzero(same_bus & (weights == 1)))
 
 def bus_score(graph_prime, bus):
     score = 0
-    for student1 in range(len(bus)):
-        for student2 in range(student1+1, len(bus)):
-            if graph_prime.has_edge(student1, student2) and graph_prime[student1][student2]['weight'] == 1:
+    for seat1 in range(len(bus)):
+        for seat2 in range(seat1+1, len(bus)):
+            if graph_prime.weight(bus[seat1], bus[seat2]) == 1:
                 score += 1
     #print(score)
     return score
@@ -310,49 +499,51 @@ def attendance(buses):
         count += len(bus)
     # print(count)
 
+def write_output(output_path, solution):
+    '''
+        Writes a solution (a list of buses, each a list of student labels) to a .out file
+
+        The file is written next to its final name and renamed into place, so
+        a reader or a killed process never leaves a partial .out file.
+    '''
+    temp_path = output_path + ".{}.tmp".format(os.getpid())
+    output_file = open(temp_path, "w")
+    seat = 1
+    for bus in solution:
+        output_file.write("[")
+        for student in bus:
+            if (seat != 1):
+                output_file.write(", '" + student + "'")
+            if (seat == 1):
+                output_file.write("'" + student + "'")
+                seat += 1
+        seat = 1
+        output_file.write("]\n")
+    output_file.close()
+    os.replace(temp_path, output_path)
+
+def read_output(output_path):
+    '''
+        Reads a .out file written by write_output back into a list of buses,
+        each a list of student labels
+    '''
+    solution = []
+    for line in open(output_path):
+        line = line[1: -2]
+        solution.append([node.replace("'","") for node in line.split(", ")])
+    return solution
+
 def main():
     '''
         Main method which iterates over all inputs and calls `solve` on each.
-        The student should modify `solve` to return their solution and modify
-        the portion which writes it to a file to make sure their output is
-        formatted correctly.
+        Instances are handed to the batch driver, which solves them in a
+        process pool and writes each .out file as soon as it is solved; run
+        batch_driver.py directly to pick the categories and pool size.
     '''
+    from batch_driver import run_batch
+
     size_categories = ["small", "medium", "large"]
-    if not os.path.isdir(path_to_outputs):
-        os.mkdir(path_to_outputs)
-
-    for size in size_categories:
-        category_path = path_to_inputs + "/" + size
-        output_category_path = path_to_outputs + "/" + size
-        category_dir = os.fsencode(category_path)
-
-        if not os.path.isdir(output_category_path):
-            os.mkdir(output_category_path)
-
-        for input_folder in os.listdir(category_dir):
-            input_name = os.fsdecode(input_folder)
-            #if (input_name == '100'):
-            graph, num_buses, size_bus, constraints = parse_input(category_path + "/" + input_name)
-            solution = solve(graph, num_buses, size_bus, constraints)
-            output_file = open(output_category_path + "/" + input_name + ".out", "w")
-
-            #TODO: modify this to write your solution to your
-            #      file properly as it might not be correct to
-            #      just write the variable solution to a file
-
-            seat = 1
-            for bus in solution:
-                output_file.write("[")
-                for student in bus:
-                    if (seat != 1):
-                        output_file.write(", '" + student + "'")
-                    if (seat == 1):
-                        output_file.write("'" + student + "'")
-                        seat += 1
-                seat = 1
-                output_file.write("]\n")
-            output_file.close()
-            print("Completed " + input_name)
+    run_batch(size_categories, path_to_inputs, path_to_outputs)
 
 if __name__ == '__main__':
     main()
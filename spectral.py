@@ -0,0 +1,111 @@
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
+from assignment import Assignment
+
+def spectral_embedding(graph_prime, dimensions, dense_below=200):
+    '''
+        Embeds every student with the leading eigenvectors of the normalized
+        friendship adjacency D^-1/2 A D^-1/2, i.e. the smallest eigenvectors of
+        the normalized Laplacian, computed with a sparse eigensolver over the
+        scoring edges of graph_prime (a dense solver below `dense_below` students,
+        where it is faster and always converges, and as a fallback when the
+        sparse one does not converge)
+
+        Outputs:
+            a num_students x dimensions array with unit-length rows (zero rows for
+            students without friends, so all zeros when every friendship is
+            inside a rowdy group)
+    '''
+    num_students = graph_prime.num_nodes
+    scoring = graph_prime.weights == 1
+    rows = np.repeat(np.arange(num_students), graph_prime.degrees())[scoring]
+    cols = graph_prime.neighbors[scoring]
+    adjacency = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_students, num_students))
+
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse_sqrt = np.zeros(num_students)
+    inverse_sqrt[degrees > 0] = 1 / np.sqrt(degrees[degrees > 0])
+    scaling = sparse.diags(inverse_sqrt)
+    normalized = scaling @ adjacency @ scaling
+    if normalized.nnz == 0:
+        # nothing to embed, and ARPACK rejects a matrix that maps every vector to zero
+        return np.zeros((num_students, dimensions))
+
+    vectors = None
+    if num_students >= dense_below and dimensions < num_students - 1:
+        start = np.random.default_rng(0).uniform(0.5, 1.5, num_students)
+        try:
+            _, vectors = eigsh(normalized, k=dimensions, which="LA", v0=start)
+        except ArpackNoConvergence:
+            vectors = None
+    if vectors is None:
+        _, vectors = np.linalg.eigh(normalized.toarray())
+        vectors = vectors[:, -dimensions:]
+
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 0)
+
+def balanced_kmeans(points, num_buses, size_bus, iterations=10, seed=0):
+    '''
+        k-means whose assignment step respects the bus capacity
+
+        Every centroid first takes its nearest unassigned point so no bus starts
+        empty, then (point, centroid) pairs are taken in order of increasing
+        distance while the centroid has room.
+
+        Outputs:
+            an array with the bus of every point
+    '''
+    rng = np.random.default_rng(seed)
+    num_points = len(points)
+    centroids = points[rng.choice(num_points, size=num_buses, replace=num_points < num_buses)]
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        bus_of = capacitated_assignment(distances, size_bus)
+        for bus_num in range(num_buses):
+            members = bus_of == bus_num
+            if members.any():
+                centroids[bus_num] = points[members].mean(axis=0)
+    return bus_of
+
+def capacitated_assignment(distances, size_bus):
+    num_points, num_buses = distances.shape
+    bus_of = np.full(num_points, -1, dtype=np.int64)
+    sizes = np.zeros(num_buses, dtype=np.int64)
+    for bus_num in range(min(num_buses, num_points)):
+        candidates = np.where(bus_of == -1, distances[:, bus_num], np.inf)
+        point = int(np.argmin(candidates))
+        bus_of[point] = bus_num
+        sizes[bus_num] += 1
+    for flat in np.argsort(distances, axis=None, kind="stable").tolist():
+        point, bus_num = divmod(flat, num_buses)
+        if bus_of[point] == -1 and sizes[bus_num] < size_bus:
+            bus_of[point] = bus_num
+            sizes[bus_num] += 1
+    return bus_of
+
+def spectral_partition(graph_prime, num_buses, size_bus, max_dimensions=16, seed=0):
+    '''
+        Capacity-respecting bus assignment from a spectral embedding of the
+        friendship graph, used as a global starting point for local search
+
+        Inputs:
+            graph_prime - a CompactGraph with weight 1 on scoring edges
+            num_buses, size_bus - the bus parameters
+            max_dimensions - cap on the number of eigenvectors computed
+            seed - seed for the k-means initialization, fixed by default so runs
+                   are reproducible
+
+        Outputs:
+            an Assignment with every bus non-empty and within size_bus
+    '''
+    num_students = graph_prime.num_nodes
+    dimensions = max(1, min(num_buses, max_dimensions, num_students - 1))
+    points = spectral_embedding(graph_prime, dimensions)
+    bus_of = balanced_kmeans(points, num_buses, size_bus, seed=seed)
+
+    assignment = Assignment(num_students, num_buses)
+    for student, bus_num in enumerate(bus_of.tolist()):
+        assignment.assign(student, bus_num)
+    return assignment
@@ -0,0 +1,114 @@
+import time
+import numpy as np
+
+def tabu_search(scorer, size_bus, max_iterations=20000, stall_limit=1000, tenure=None, time_budget=None,
+                swap_candidates=8, should_stop=None):
+    '''
+        Tabu search over single-student moves
+
+        Every iteration evaluates the whole move neighborhood at once from the
+        scorer's friend counts (gain of student s to bus b is
+        friends[s, b] - friends[s, bus_of[s]]) and applies the best non-tabu
+        move, even when it lowers the score. A move into a full bus is completed
+        as a swap with the best partner on that bus; only the `swap_candidates`
+        most promising of those are evaluated. Moving s off bus a makes (s, a)
+        tabu for `tenure` iterations; a tabu move is still allowed when it would
+        beat the best score found so far (aspiration). Buses never exceed
+        size_bus and are never left empty.
+
+        Inputs:
+            scorer - an IncrementalScorer holding a feasible assignment, searched in place
+            size_bus - the capacity of every bus
+            max_iterations - upper bound on the number of moves
+            stall_limit - stop after this many iterations without a new best
+            tenure - iterations a (student, bus) pair stays tabu, scaled to the instance by default
+            time_budget - optional number of seconds after which to stop
+            swap_candidates - how many moves into full buses are completed as swaps per iteration
+            should_stop - optional callback, checked with the time budget, that
+                          stops the search when it returns True
+
+        Outputs:
+            (best_score, iterations, iterations_per_second) - the scorer is left
+            on the best assignment found
+    '''
+    num_students = len(scorer.bus_of)
+    num_buses = scorer.num_buses
+    if num_students < 2 or num_buses < 2:
+        return scorer.score, 0, 0.0
+    if tenure is None:
+        tenure = max(7, num_students // 20)
+
+    students = np.arange(num_students)
+    tabu_until = np.zeros((num_students, num_buses), dtype=np.int64)
+    best_score = scorer.score
+    best_bus_of = scorer.bus_of.copy()
+    last_improvement = 0
+    # no partner can return more than its own degree
+    max_return = int(scorer.graph_prime.degrees().max())
+
+    start = time.time()
+    iteration = 0
+    while iteration < max_iterations and iteration - last_improvement < stall_limit:
+        if (time_budget is not None and time.time() - start >= time_budget) or (should_stop is not None and should_stop()):
+            break
+        iteration += 1
+
+        bus_of = scorer.bus_of
+        gains = scorer.friends - scorer.friends[students, bus_of][:, None]
+        open_targets = scorer.sizes < size_bus
+        allowed = (tabu_until < iteration) | (scorer.score + gains > best_score)
+        allowed[students, bus_of] = False
+
+        # plain moves into buses with room, leaving no bus empty
+        movable = allowed & open_targets[None, :] & (scorer.sizes[bus_of] > 1)[:, None]
+        best_gain = None
+        if movable.any():
+            flat = int(np.argmax(np.where(movable, gains, np.iinfo(gains.dtype).min)))
+            student, bus_num = divmod(flat, num_buses)
+            best_gain = int(gains[student, bus_num])
+            partner = None
+
+        # moves into full buses become swaps with the best partner on that bus;
+        # only the most promising few are completed to keep iterations cheap
+        blocked = np.where(allowed & ~open_targets[None, :], gains, np.iinfo(gains.dtype).min).ravel()
+        candidates = np.argpartition(blocked, -swap_candidates)[-swap_candidates:] if len(blocked) > swap_candidates \
+            else np.arange(len(blocked))
+        for flat in candidates[np.argsort(blocked[candidates])[::-1]].tolist():
+            if blocked[flat] == np.iinfo(gains.dtype).min or (best_gain is not None and blocked[flat] + max_return <= best_gain):
+                break
+            swap_student, swap_bus = divmod(flat, num_buses)
+            others = np.fromiter(scorer.assignment.members[swap_bus], dtype=np.int64)
+            old_bus = bus_of[swap_student]
+            partner_gains = gains[others, old_bus]
+            partner_ok = (tabu_until[others, old_bus] < iteration) | \
+                (scorer.score + blocked[flat] + partner_gains > best_score)
+            if not partner_ok.any():
+                continue
+            friend_list = scorer.friend_lists[swap_student]
+            if len(friend_list):
+                positions = np.minimum(np.searchsorted(friend_list, others), len(friend_list) - 1)
+                partner_gains = partner_gains - 2 * (friend_list[positions] == others)
+            partner_gains = np.where(partner_ok, partner_gains, np.iinfo(gains.dtype).min)
+            best_partner = int(np.argmax(partner_gains))
+            swap_gain = int(blocked[flat] + partner_gains[best_partner])
+            if best_gain is None or swap_gain > best_gain:
+                student, bus_num, best_gain = swap_student, swap_bus, swap_gain
+                partner = int(others[best_partner])
+
+        if best_gain is None:
+            break
+        tabu_until[student, bus_of[student]] = iteration + tenure
+        if partner is None:
+            scorer.move(student, bus_num)
+        else:
+            tabu_until[partner, bus_num] = iteration + tenure
+            scorer.swap(student, partner)
+        if scorer.score > best_score:
+            best_score = scorer.score
+            best_bus_of = scorer.bus_of.copy()
+            last_improvement = iteration
+
+    for student in (scorer.bus_of != best_bus_of).nonzero()[0].tolist():
+        scorer.move(student, int(best_bus_of[student]))
+    elapsed = time.time() - start
+    return scorer.score, iteration, iteration / elapsed if elapsed > 0 else 0.0
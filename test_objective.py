@@ -0,0 +1,91 @@
+import os
+import random
+import pytest
+from assignment import Assignment
+from objective import ExactScorer, exact_fraction, exact_score
+from output_scorer import score_output, score_output_fast
+from solver import build_rowdy_index, load_instance, read_output
+
+####################################################
+# To run:
+#   python3 -m pytest test_objective.py
+#
+# Cross-checks the exact evaluator of objective.py against output_scorer on
+# committed outputs, and its move and swap gains against full re-evaluation.
+####################################################
+
+repo = os.path.dirname(os.path.abspath(__file__))
+
+# large/1023 has every friendship inside a rowdy group
+instances = ["small/5", "small/211", "medium/100", "large/1023", "large2/1030"]
+
+# score_output builds a NetworkX graph, too slow to run on the large inputs
+reference_instances = ["small/5", "small/211", "medium/100"]
+
+def load(instance):
+    input_folder = os.path.join(repo, "all_inputs", instance)
+    output_file = os.path.join(repo, "outputs", instance + ".out")
+    graph, num_buses, size_bus, constraints, graph_prime = load_instance(input_folder)
+    buses = [graph.ids(bus) for bus in read_output(output_file)]
+    assignment = Assignment.from_buses(graph.num_nodes, buses)
+    return input_folder, output_file, graph_prime, build_rowdy_index(graph_prime, constraints), assignment
+
+@pytest.mark.parametrize("instance", instances)
+def test_exact_fraction_matches_fast_scorer(instance):
+    input_folder, output_file, graph_prime, rowdy_index, assignment = load(instance)
+    reference, msg = score_output_fast(input_folder, output_file)
+    assert reference >= 0, msg
+    assert exact_fraction(graph_prime, rowdy_index, assignment.bus_of) == pytest.approx(reference, abs=1e-12)
+
+@pytest.mark.parametrize("instance", reference_instances)
+def test_exact_fraction_matches_reference_scorer(instance):
+    input_folder, output_file, graph_prime, rowdy_index, assignment = load(instance)
+    reference, msg = score_output(input_folder, output_file)
+    assert reference >= 0, msg
+    assert exact_fraction(graph_prime, rowdy_index, assignment.bus_of) == pytest.approx(reference, abs=1e-12)
+
+@pytest.mark.parametrize("instance", instances)
+def test_gains_match_full_evaluation(instance):
+    input_folder, output_file, graph_prime, rowdy_index, assignment = load(instance)
+    scorer = ExactScorer(graph_prime, assignment, rowdy_index)
+    rng = random.Random(0)
+    num_students = len(scorer.bus_of)
+    for step in range(300):
+        student = rng.randrange(num_students)
+        if step % 2:
+            other = rng.randrange(num_students)
+            if scorer.bus_of[student] == scorer.bus_of[other]:
+                continue
+            bus_of = scorer.bus_of.copy()
+            bus_of[student], bus_of[other] = bus_of[other], bus_of[student]
+            gain = scorer.swap_gain(student, other)
+            assert scorer.score + gain == exact_score(graph_prime, rowdy_index, bus_of)
+            scorer.swap(student, other)
+        else:
+            bus_num = rng.randrange(scorer.num_buses)
+            if bus_num == scorer.bus_of[student]:
+                continue
+            bus_of = scorer.bus_of.copy()
+            bus_of[student] = bus_num
+            gain = scorer.move_gain(student, bus_num)
+            assert scorer.score + gain == exact_score(graph_prime, rowdy_index, bus_of)
+            scorer.move(student, bus_num)
+        assert scorer.score == exact_score(graph_prime, rowdy_index, scorer.bus_of)
+
+@pytest.mark.parametrize("instance", instances)
+def test_move_gains_match_full_evaluation(instance):
+    input_folder, output_file, graph_prime, rowdy_index, assignment = load(instance)
+    scorer = ExactScorer(graph_prime, assignment, rowdy_index)
+    rng = random.Random(0)
+    num_students = len(scorer.bus_of)
+    # students of complete rowdy groups first, where the gains are not read from the friend counts
+    students = [s for s in range(num_students) if len(scorer.rowdy.broken_by(s))][:20]
+    students += rng.sample(range(num_students), min(20, num_students))
+    for student in students:
+        gains = scorer.move_gains(student)
+        for bus_num in range(scorer.num_buses):
+            bus_of = scorer.bus_of.copy()
+            bus_of[student] = bus_num
+            assert scorer.score + gains[bus_num] == exact_score(graph_prime, rowdy_index, bus_of)
+        assert scorer.score == exact_score(graph_prime, rowdy_index, scorer.bus_of)
+        scorer.move(student, rng.randrange(scorer.num_buses))
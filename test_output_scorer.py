@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import time
+
+####################################################
+# To run:
+#   python3 -m pytest test_output_scorer.py
+####################################################
+
+repo = os.path.dirname(os.path.abspath(__file__))
+input_folder = os.path.join(repo, "all_inputs", "small", "5")
+output_file = os.path.join(repo, "outputs", "small", "5.out")
+
+# Seconds a single-file invocation may take; the NumPy scorer needs about 0.2s
+# on small inputs, the NetworkX one more than twice that before scoring anything
+startup_budget = 1.5
+
+def test_default_invocation_is_within_startup_budget():
+    start = time.time()
+    result = subprocess.run([sys.executable, "output_scorer.py", input_folder, output_file],
+                            cwd=repo, capture_output=True, text=True)
+    elapsed = time.time() - start
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith("Valid output submitted with score:")
+    assert elapsed < startup_budget
+
+def test_default_invocation_skips_heavy_imports():
+    # run the script as __main__ and report which of the heavy modules got imported
+    code = ("import runpy, sys\n"
+            "sys.argv = ['output_scorer.py', {!r}, {!r}]\n"
+            "runpy.run_path('output_scorer.py', run_name='__main__')\n"
+            "print(sorted(name for name in ('networkx', 'matplotlib') if name in sys.modules))\n"
+            ).format(input_folder, output_file)
+    result = subprocess.run([sys.executable, "-c", code], cwd=repo, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "[]"